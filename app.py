@@ -1,19 +1,32 @@
 #!/usr/bin/env python3
 
-import boto3
 from aws_cdk import core
 
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_network import CdkEcsWindowsFSXNetwork
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_directory import CdkEcsWindowsFSXDirectory
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_storage import CdkEcsWindowsFSXStorage
 from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_cluster import CdkEcsWindowsFSXCluster
 from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_bastion import CdkEcsWindowsFSXBastion
 from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_website import CdkEcsWindowsFSXWebsite
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_load_balancer import CdkEcsWindowsFSXLoadBalancer
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_image import CdkEcsWindowsFSXImage
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_cdn import CdkEcsWindowsFSXCdn
+from cdk_ecs_windows_fsx.cdk_ecs_windows_fsx_loadgen import CdkEcsWindowsFSXLoadGen
+from cdk_ecs_windows_fsx.site_registry import load_sites
+from cdk_ecs_windows_fsx.account import resolve_account
+from cdk_ecs_windows_fsx.capacity_profiles import INSTANCE_TYPES, get_capacity_profile
+from cdk_ecs_windows_fsx.capacity_planner import WINDOWS_RESERVED_MEMORY_MIB, plan_capacity, format_site_plan
+from cdk_ecs_windows_fsx.scaling_schedules import get_schedule, check_scheduled_capacity
+from cdk_ecs_windows_fsx.fsx_placement import place_sites
+
+app = core.App()
 
 # Params
 env = core.Environment(
-    account=boto3.client('sts').get_caller_identity().get('Account'),
+    account=resolve_account(app),
     region="eu-west-1"
 )
 
-app = core.App()
 hosted_zone_id = app.node.try_get_context('hosted_zone_id')
 if hosted_zone_id is None:
     hosted_zone_id = ''
@@ -22,24 +35,191 @@ zone_name = app.node.try_get_context('zone_name')
 if zone_name is None:
     zone_name = ''
 
+# Cluster settings and the site registry, see cdk.json
+cluster_config = app.node.try_get_context('cluster') or {}
+sites = load_sites(app)
+
+# Capacity Plan - Check every site's peak task count fits the cluster at its maximum size, before a long deploy finds out
+# capacity_check: error (fail synth), warn or off
+capacity_check = cluster_config.get('capacity_check', 'error')
+capacity_profile = get_capacity_profile(cluster_config.get('capacity_profile', 'burstable'))
+reserved_memory_mib = cluster_config.get('reserved_memory_mib', WINDOWS_RESERVED_MEMORY_MIB)
+capacity_plan = plan_capacity(
+    {t: INSTANCE_TYPES[t] for t in capacity_profile['instance_types']},
+    cluster_config.get('max_capacity', 2),
+    sites,
+    reserved_memory_mib=reserved_memory_mib
+)
+
+# Scaling Schedules - Validate every scaling window, then plan capacity again for each combination of windows active at once
+cluster_schedule = get_schedule(cluster_config.get('schedules'), cluster_config.get('min_capacity', 2), cluster_config.get('max_capacity', 2), "Cluster")
+site_schedules = {}
+for site in sites:
+    if site.get('schedules'):
+        if site.get('max_capacity') is None:
+            raise Exception("Site " + site['name'] + " has scaling windows, set its max_capacity to enable service auto scaling")
+        site_min_capacity = site.get('min_capacity') if site.get('min_capacity') is not None else site['desired_count']
+        site_schedules[site['name']] = get_schedule(site['schedules'], site_min_capacity, site['max_capacity'], "Site " + site['name'], allow_desired=False)
+capacity_plan['errors'] += check_scheduled_capacity(
+    {t: INSTANCE_TYPES[t] for t in capacity_profile['instance_types']},
+    cluster_config.get('max_capacity', 2),
+    cluster_schedule,
+    sites,
+    site_schedules,
+    reserved_memory_mib=reserved_memory_mib
+)
+capacity_plan['feasible'] = not capacity_plan['errors']
+if capacity_check == 'error' and not capacity_plan['feasible']:
+    raise Exception("Sites don't fit on the cluster: " + "; ".join(capacity_plan['errors']))
+
+# Golden AMI - Optionally bake the cluster host image with EC2 Image Builder, an explicit ami_id wins
+ami_id = cluster_config.get('ami_id')
+if ami_id is None and cluster_config.get('golden_image'):
+    ami_id = CdkEcsWindowsFSXImage(app, "cdk-ecs-windows-image",
+        subnet_id=cluster_config.get('golden_image_subnet_id'),
+        env=env
+    ).image_id
+
+# Infrastructure Stacks - network <- directory <- storage, and network + directory <- compute
+# Storage and compute only share the network and directory stacks, so they deploy in parallel with cdk deploy --concurrency
+# and a change to the cluster hosts or a site never updates Managed AD or FSx
+network = CdkEcsWindowsFSXNetwork(app, "cdk-ecs-windows-network",
+    vpc_endpoints=cluster_config.get('vpc_endpoints', False),
+    env=env
+)
+directory = CdkEcsWindowsFSXDirectory(app, "cdk-ecs-windows-directory",
+    vpc=network.vpc,
+    private_subnet_ids=network.private_subnet_ids,
+    dns_mode=cluster_config.get('dns_mode', 'directory'),
+    env=env
+)
+storage = CdkEcsWindowsFSXStorage(app, "cdk-ecs-windows-storage",
+    vpc=network.vpc,
+    private_subnet_ids=network.private_subnet_ids,
+    fsx_sg=network.fsx_sg,
+    directory_id=directory.directory_id,
+    fsx_profile=cluster_config.get('fsx_profile', 'minimal'),
+    fsx_overrides=cluster_config.get('fsx'),
+    fsx_autotune=cluster_config.get('fsx_autotune'),
+    file_systems=cluster_config.get('file_systems', 1),
+    env=env
+)
 cluster = CdkEcsWindowsFSXCluster(app, "cdk-ecs-windows-cluster", 
+    vpc=network.vpc,
+    hosts_sg=network.hosts_sg,
+    mad_secret_name=directory.mad_secret_name,
+    min_capacity=cluster_config.get('min_capacity', 2),
+    max_capacity=cluster_config.get('max_capacity', 2),
+    target_capacity_percent=cluster_config.get('target_capacity_percent'),
+    image_mirror=cluster_config.get('image_mirror'),
+    ami_id=ami_id,
+    warm_pool=cluster_config.get('warm_pool'),
+    capacity_profile=cluster_config.get('capacity_profile', 'burstable'),
+    container_insights=cluster_config.get('container_insights', True),
+    reserved_memory_mib=reserved_memory_mib,
+    scaling_schedule=cluster_schedule,
+    schedule_timezone=cluster_config.get('schedule_timezone', 'UTC'),
+    predictive_scaling=cluster_config.get('predictive_scaling'),
     env=env
 )
 CdkEcsWindowsFSXBastion(app, "cdk-ecs-windows-bastion", 
-    vpc=cluster.vpc, 
-    bastion_sg=cluster.bastion_sg, 
+    vpc=network.vpc, 
+    bastion_sg=network.bastion_sg, 
     env=env
 )
-CdkEcsWindowsFSXWebsite(app, "cdk-ecs-windows-website1", 
-    cluster=cluster.cluster, 
-    env=env, 
-    hosted_zone_id=hosted_zone_id, 
-    zone_name=zone_name, 
-    sub_domain="website1", 
-    host_port=8081, # This port must be unique per task/cluster i.e. increment it per site
-    file_system_id = cluster.file_system_id, 
-    mad_secret_arn = cluster.mad_secret_arn, 
-    mad_domain_name = cluster.mad_domain_name
-)
+
+# Shared ALBs - Sites name the ALB they sit behind, each ALB serves its sites through host-header rules
+load_balancer_config = app.node.try_get_context('load_balancers') or {}
+load_balancers = {}
+for site in sites:
+    if site['load_balancer'] not in load_balancers:
+        load_balancers[site['load_balancer']] = CdkEcsWindowsFSXLoadBalancer(app, "cdk-ecs-windows-alb-" + site['load_balancer'],
+            vpc=network.vpc,
+            cluster=cluster.cluster,
+            hosted_zone_id=hosted_zone_id,
+            zone_name=zone_name,
+            settings=load_balancer_config.get(site['load_balancer']),
+            env=env
+        )
+
+# FSx placement - Each site is assigned one of the cluster's file systems by consistent hashing on its name
+file_system_placement = place_sites(sites, len(storage.file_system_ids))
+
+for site, site_plan in zip(sites, capacity_plan['sites']):
+    load_balancer = load_balancers[site['load_balancer']]
+    website = CdkEcsWindowsFSXWebsite(app, "cdk-ecs-windows-" + site['name'], 
+        cluster=cluster.cluster, 
+        load_balancer=load_balancer.load_balancer,
+        listener=load_balancer.https_listener,
+        priority=site['priority'],
+        env=env, 
+        hosted_zone_id=hosted_zone_id, 
+        zone_name=zone_name, 
+        sub_domain=site['sub_domain'], 
+        host_port=site['host_port'],
+        cpu=site['cpu'],
+        memory=site['memory'],
+        root_directory=site['root_directory'],
+        site_directory=site['site_directory'],
+        content_sync_mode=site['content_sync_mode'],
+        content_sync_interval=site['content_sync_interval'],
+        file_system_id = storage.file_system_ids[file_system_placement[site['name']]], 
+        mad_secret_arn = directory.mad_secret_arn, 
+        mad_domain_name = directory.mad_domain_name,
+        image=cluster.image,
+        image_repository_arn=cluster.image_repository_arn,
+        desired_count=site['desired_count'],
+        min_capacity=site.get('min_capacity'),
+        max_capacity=site.get('max_capacity'),
+        requests_per_target=site.get('requests_per_target'),
+        cpu_target_percent=site.get('cpu_target_percent'),
+        memory_target_percent=site.get('memory_target_percent'),
+        capacity_provider_name=cluster.capacity_provider_name,
+        cdn=site.get('cdn'),
+        target_group_preset=site['target_group_preset'],
+        target_group_settings=site.get('target_group'),
+        placement_strategy=site['placement'],
+        fsx_availability_zone=storage.file_system_availability_zone if site['fsx_az_affinity'] else None,
+        observability=site.get('observability'),
+        auto_scaling_group_name=cluster.auto_scaling_group_name,
+        scaling_schedule=site_schedules.get(site['name']),
+        schedule_timezone=site.get('schedule_timezone', 'UTC'),
+        iis_preset=site['iis_preset'],
+        iis_settings=site.get('iis')
+    )
+    # CloudFront - The distribution and its certificate live in us-east-1, the website stack creates the origin secret first
+    if site.get('cdn') is not None:
+        cdn = CdkEcsWindowsFSXCdn(app, "cdk-ecs-windows-cdn-" + site['name'],
+            hosted_zone_id=hosted_zone_id,
+            zone_name=zone_name,
+            sub_domain=site['sub_domain'],
+            origin_secret_name=website.origin_secret_name,
+            cdn=site['cdn'],
+            env=core.Environment(account=env.account, region="us-east-1")
+        )
+        cdn.add_dependency(website)
+    if capacity_check != 'off':
+        core.Annotations.of(website).add_info(format_site_plan(capacity_plan, site_plan))
+    core.Annotations.of(website).add_info(site['name'] + ": FSx file system " + str(file_system_placement[site['name']]) + ", directory " + site['root_directory'] + "\\" + site['site_directory'] + "\\wwwroot")
+
+# Load Generator - Optional Fargate task to measure a site under load, see loadgen/
+loadgen_config = app.node.try_get_context('loadgen')
+if loadgen_config is not None:
+    target_sites = [site for site in sites if site['name'] == loadgen_config.get('site', sites[0]['name'])]
+    if not target_sites:
+        raise Exception("Load generator site '" + loadgen_config['site'] + "' isn't in the site registry")
+    CdkEcsWindowsFSXLoadGen(app, "cdk-ecs-windows-loadgen",
+        vpc=network.vpc,
+        private_subnet_ids=network.private_subnet_ids,
+        cluster=cluster.cluster,
+        endpoint_sg=network.endpoint_sg,
+        url=loadgen_config.get('url', 'https://' + target_sites[0]['sub_domain'] + '.' + zone_name + '/'),
+        loadgen={k: v for k, v in loadgen_config.items() if k not in ('site', 'url')},
+        env=env
+    )
+
+if capacity_check == 'warn':
+    for error in capacity_plan['errors']:
+        core.Annotations.of(cluster).add_warning(error)
 
 app.synth()
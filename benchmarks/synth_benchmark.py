@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measure wall-clock synth time of the full CDK app.
+
+Runs app.py the same way the CDK CLI does (context passed through CDK_CONTEXT_JSON,
+output written to CDK_OUTDIR) in offline mode, so no AWS credentials or network are needed.
+
+    python3 benchmarks/synth_benchmark.py --runs 5 --max-seconds 60
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import simplejson as json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synth_context(extra_context):
+    with open(os.path.join(ROOT, 'cdk.json')) as fp:
+        context = json.load(fp).get('context', {})
+    # Placeholder values so the website stacks synth without a real hosted zone
+    context.update({
+        'offline': 'true',
+        'account': '123456789012',
+        'zone_name': 'example.com',
+        'hosted_zone_id': 'Z0123456789ABCDEFGHIJ',
+    })
+    context.update(extra_context)
+    return context
+
+
+def time_synth(context):
+    with tempfile.TemporaryDirectory() as outdir:
+        environment = dict(os.environ,
+            CDK_CONTEXT_JSON=json.dumps(context),
+            CDK_OUTDIR=outdir
+        )
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'app.py'], cwd=ROOT, env=environment, check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='number of timed synths')
+    parser.add_argument('--context', action='append', default=[], metavar='KEY=VALUE', help='extra context value, may be repeated')
+    parser.add_argument('--max-seconds', type=float, help='fail when the median synth time exceeds this budget')
+    parser.add_argument('--output', help='write the timings as JSON to this file')
+    args = parser.parse_args()
+
+    context = synth_context(dict(c.split('=', 1) for c in args.context))
+    timings = [time_synth(context) for _ in range(args.runs)]
+
+    result = {
+        'runs': args.runs,
+        'min_seconds': round(min(timings), 3),
+        'median_seconds': round(statistics.median(timings), 3),
+        'max_seconds': round(max(timings), 3),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(result, fp, indent=2)
+
+    if args.max_seconds is not None and result['median_seconds'] > args.max_seconds:
+        print('Median synth time %.3fs exceeds the %.3fs budget' % (result['median_seconds'], args.max_seconds), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
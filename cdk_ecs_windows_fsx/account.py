@@ -0,0 +1,32 @@
+import os
+import simplejson as json
+
+# Last account looked up through STS, so later synths don't need credentials or a network round trip
+ACCOUNT_CACHE_FILE = '.cdk-account.json'
+
+def resolve_account(app):
+    # 1. Explicit account context value e.g. --context account=123456789012
+    account = app.node.try_get_context('account')
+    if account:
+        return str(account)
+
+    # 2. Environment, CDK_DEFAULT_ACCOUNT is set by the CDK CLI, AWS_ACCOUNT_ID can be set by CI
+    for variable in ['CDK_DEFAULT_ACCOUNT', 'AWS_ACCOUNT_ID']:
+        if os.environ.get(variable):
+            return os.environ[variable]
+
+    # 3. Cached result of an earlier STS lookup
+    if os.path.exists(ACCOUNT_CACHE_FILE):
+        with open(ACCOUNT_CACHE_FILE) as fp:
+            return json.load(fp)['Account']
+
+    # Offline synth - leave the account unresolved (environment agnostic stacks) rather than calling STS
+    if str(app.node.try_get_context('offline')).lower() == 'true':
+        return None
+
+    # 4. STS, only imported when needed as boto3 is slow to load
+    import boto3
+    account = boto3.client('sts').get_caller_identity().get('Account')
+    with open(ACCOUNT_CACHE_FILE, 'w') as fp:
+        json.dump({'Account': account}, fp)
+    return account
@@ -0,0 +1,84 @@
+# Target group presets for site stacks, durations in seconds
+# https://docs.aws.amazon.com/elasticloadbalancing/latest/application/load-balancer-target-groups.html#target-group-attributes
+TARGET_GROUP_PRESETS = {
+    # Quick drains and a 60s ramp up so cold IIS app pools aren't hit with a full share of requests at once
+    'balanced': {
+        'deregistration_delay': 30,
+        'slow_start': 60,
+        'algorithm': 'round_robin',
+        'health_check_path': '/',
+        'health_check_interval': 15,
+        'health_check_timeout': 5,
+        'healthy_threshold': 2,
+        'unhealthy_threshold': 3
+    },
+    # Shortest rolling deploys, for sites without long running requests
+    'fast-deploy': {
+        'deregistration_delay': 10,
+        'slow_start': 30,
+        'algorithm': 'round_robin',
+        'health_check_path': '/',
+        'health_check_interval': 10,
+        'health_check_timeout': 5,
+        'healthy_threshold': 2,
+        'unhealthy_threshold': 2
+    },
+    # Requests of very different cost, new targets get traffic immediately (the ALB doesn't combine slow start with this algorithm)
+    'least-outstanding': {
+        'deregistration_delay': 30,
+        'slow_start': 0,
+        'algorithm': 'least_outstanding_requests',
+        'health_check_path': '/',
+        'health_check_interval': 15,
+        'health_check_timeout': 5,
+        'healthy_threshold': 2,
+        'unhealthy_threshold': 3
+    },
+    # The ELB defaults the original sample used
+    'aws-default': {
+        'deregistration_delay': 300,
+        'slow_start': 0,
+        'algorithm': 'round_robin',
+        'health_check_path': '/',
+        'health_check_interval': 30,
+        'health_check_timeout': 5,
+        'healthy_threshold': 5,
+        'unhealthy_threshold': 2
+    },
+}
+
+# Shared ALB settings, per load balancer name in the load_balancers context value
+LOAD_BALANCER_DEFAULTS = {
+    'idle_timeout': 60,
+    'http2': True
+}
+
+def get_target_group_settings(preset: str, overrides: dict = None) -> dict:
+    if preset not in TARGET_GROUP_PRESETS:
+        raise Exception("Unknown target group preset " + preset + ", choose one of " + ", ".join(TARGET_GROUP_PRESETS))
+    settings = dict(TARGET_GROUP_PRESETS[preset])
+    settings.update(overrides or {})
+
+    if settings['algorithm'] not in ('round_robin', 'least_outstanding_requests'):
+        raise Exception("Target group algorithm must be round_robin or least_outstanding_requests")
+    if not 0 <= settings['deregistration_delay'] <= 3600:
+        raise Exception("Target group deregistration_delay must be between 0 and 3600 seconds")
+    if settings['slow_start'] and not 30 <= settings['slow_start'] <= 900:
+        raise Exception("Target group slow_start must be 0 (off) or between 30 and 900 seconds")
+    if settings['slow_start'] and settings['algorithm'] == 'least_outstanding_requests':
+        raise Exception("Target group slow_start can't be combined with the least_outstanding_requests algorithm")
+    if not 5 <= settings['health_check_interval'] <= 300:
+        raise Exception("Target group health_check_interval must be between 5 and 300 seconds")
+    if not 2 <= settings['health_check_timeout'] < settings['health_check_interval']:
+        raise Exception("Target group health_check_timeout must be at least 2 seconds and less than health_check_interval")
+    for threshold in ['healthy_threshold', 'unhealthy_threshold']:
+        if not 2 <= settings[threshold] <= 10:
+            raise Exception("Target group " + threshold + " must be between 2 and 10")
+    return settings
+
+def get_load_balancer_settings(overrides: dict = None) -> dict:
+    settings = dict(LOAD_BALANCER_DEFAULTS)
+    settings.update(overrides or {})
+    if not 1 <= settings['idle_timeout'] <= 4000:
+        raise Exception("Load balancer idle_timeout must be between 1 and 4000 seconds")
+    return settings
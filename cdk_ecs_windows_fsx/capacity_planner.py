@@ -0,0 +1,99 @@
+"""Synth-time capacity planning for site tasks on the cluster hosts.
+
+Pure Python with no AWS or CDK dependencies. Sites are dicts with the site registry keys
+(name, cpu, memory, host_port, desired_count, max_capacity), instance types are entries of
+capacity_profiles.INSTANCE_TYPES.
+"""
+
+# Windows hands out dynamic host ports from 49152-65535
+WINDOWS_EPHEMERAL_PORTS = 65535 - 49152 + 1
+
+# Memory per host left to Windows Server Core, the ECS agent and the domain services, the cluster hosts
+# reserve it with ECS_RESERVED_MEMORY so tasks are placed against the same figure the plan uses
+WINDOWS_RESERVED_MEMORY_MIB = 1024
+
+
+def peak_tasks(site: dict) -> int:
+    # The most tasks a site can ask for, its scaling maximum when it scales
+    return max(site.get('desired_count', 0), site.get('max_capacity') or 0)
+
+
+def tasks_per_instance(instance: dict, site: dict, reserved_memory_mib: int = WINDOWS_RESERVED_MEMORY_MIB, network_mode: str = 'default') -> dict:
+    # How many tasks of a single site fit on an empty instance, and which resource runs out first
+    limits = {
+        'cpu': instance['vcpu'] * 1024 // site['cpu'],
+        'memory': (instance['memory_mib'] - reserved_memory_mib) // site['memory'],
+        'ports': 1 if site.get('host_port') else WINDOWS_EPHEMERAL_PORTS,
+    }
+    # Only awsvpc tasks take an ENI each, the primary ENI belongs to the instance
+    if network_mode == 'awsvpc':
+        limits['enis'] = instance['enis'] - 1
+    limited_by = min(limits, key=limits.get)
+    return {'tasks': max(limits[limited_by], 0), 'limited_by': limited_by}
+
+
+def pack(instance: dict, instances: int, demand: list, reserved_memory_mib: int = WINDOWS_RESERVED_MEMORY_MIB) -> list:
+    # First fit decreasing placement of (site, tasks) demand onto identical instances
+    # Returns the sites with the number of tasks that could not be placed
+    free = [{'cpu': instance['vcpu'] * 1024, 'memory': instance['memory_mib'] - reserved_memory_mib, 'ports': set()} for _ in range(instances)]
+    tasks = [site for site, count in demand for _ in range(count)]
+    tasks.sort(key=lambda site: (site['memory'], site['cpu']), reverse=True)
+
+    unplaced = {}
+    for site in tasks:
+        for host in free:
+            port = site.get('host_port')
+            if host['cpu'] >= site['cpu'] and host['memory'] >= site['memory'] and not (port and port in host['ports']):
+                host['cpu'] -= site['cpu']
+                host['memory'] -= site['memory']
+                if port:
+                    host['ports'].add(port)
+                break
+        else:
+            unplaced[site['name']] = unplaced.get(site['name'], 0) + 1
+    return [(name, count) for name, count in unplaced.items()]
+
+
+def plan_capacity(instance_types: dict, instances: int, sites: list, reserved_memory_mib: int = WINDOWS_RESERVED_MEMORY_MIB) -> dict:
+    # Plan against the smallest instance type the cluster may launch, mixed instances policies can pick any of them
+    instance_type = min(instance_types, key=lambda t: (instance_types[t]['vcpu'], instance_types[t]['memory_mib']))
+    instance = instance_types[instance_type]
+
+    demand = [(site, peak_tasks(site)) for site in sites]
+    unplaced = dict(pack(instance, instances, demand, reserved_memory_mib))
+
+    report = []
+    errors = []
+    for site in sites:
+        fit = tasks_per_instance(instance, site, reserved_memory_mib)
+        if fit['tasks'] == 0:
+            errors.append("Site " + site['name'] + " needs " + str(site['cpu']) + " CPU units and " + str(site['memory']) + " MiB, more than a whole " + instance_type + " offers")
+        elif site['name'] in unplaced:
+            errors.append("Site " + site['name'] + " can't place " + str(unplaced[site['name']]) + " of its " + str(peak_tasks(site)) + " peak tasks on " + str(instances) + " x " + instance_type)
+
+        # Headroom - extra tasks of this site that still fit with every other site at its peak
+        headroom = 0
+        if not unplaced:
+            while headroom < fit['tasks'] * instances and not pack(instance, instances, demand + [(site, headroom + 1)], reserved_memory_mib):
+                headroom += 1
+
+        report.append({
+            'name': site['name'],
+            'peak_tasks': peak_tasks(site),
+            'tasks_per_instance': fit['tasks'],
+            'limited_by': fit['limited_by'],
+            'headroom': headroom
+        })
+
+    return {
+        'instance_type': instance_type,
+        'instances': instances,
+        'sites': report,
+        'feasible': not errors,
+        'errors': errors
+    }
+
+
+def format_site_plan(plan: dict, site: dict) -> str:
+    return (site['name'] + ": " + str(site['peak_tasks']) + " peak tasks, " + str(site['tasks_per_instance']) + " per " + plan['instance_type'] +
+        " (limited by " + site['limited_by'] + "), headroom " + str(site['headroom']) + " tasks on " + str(plan['instances']) + " instances")
@@ -0,0 +1,46 @@
+# vCPU, memory and ENI limits of the instance types the capacity profiles use
+# https://docs.aws.amazon.com/AWSEC2/latest/UserGuide/using-eni.html#AvailableIpPerENI
+INSTANCE_TYPES = {
+    't3.medium': {'vcpu': 2, 'memory_mib': 4096, 'enis': 3},
+    't3.large': {'vcpu': 2, 'memory_mib': 8192, 'enis': 3},
+    'c5.xlarge': {'vcpu': 4, 'memory_mib': 8192, 'enis': 4},
+    'c5a.xlarge': {'vcpu': 4, 'memory_mib': 8192, 'enis': 4},
+    'c6i.xlarge': {'vcpu': 4, 'memory_mib': 8192, 'enis': 4},
+    'r5.large': {'vcpu': 2, 'memory_mib': 16384, 'enis': 3},
+    'r5a.large': {'vcpu': 2, 'memory_mib': 16384, 'enis': 3},
+    'r6i.large': {'vcpu': 2, 'memory_mib': 16384, 'enis': 3},
+    'm5.large': {'vcpu': 2, 'memory_mib': 8192, 'enis': 3},
+    'm5a.large': {'vcpu': 2, 'memory_mib': 8192, 'enis': 3},
+    'm6i.large': {'vcpu': 2, 'memory_mib': 8192, 'enis': 3},
+}
+
+# Named cluster capacity profiles, instance types within a profile are interchangeable (same vCPU and memory)
+# so the ASG can pick whichever has capacity. Spot settings follow the ASG InstancesDistribution properties.
+CAPACITY_PROFILES = {
+    # Original sample sizing, credits unlimited so sustained load isn't throttled to the T3 baseline
+    'burstable': {
+        'instance_types': ['t3.medium'],
+        'cpu_credits': 'unlimited'
+    },
+    'compute-optimized': {
+        'instance_types': ['c5.xlarge', 'c5a.xlarge', 'c6i.xlarge']
+    },
+    'memory-optimized': {
+        'instance_types': ['r5.large', 'r5a.large', 'r6i.large']
+    },
+    # One On-Demand host as a floor, 25% On-Demand above it, the rest Spot from the deepest pools
+    'spot-mixed': {
+        'instance_types': ['m5.large', 'm5a.large', 'm6i.large'],
+        'on_demand_base_capacity': 1,
+        'on_demand_percentage_above_base_capacity': 25,
+        'spot_allocation_strategy': 'capacity-optimized'
+    },
+}
+
+def get_capacity_profile(name: str) -> dict:
+    if name not in CAPACITY_PROFILES:
+        raise Exception("Unknown capacity profile " + name + ", choose one of " + ", ".join(CAPACITY_PROFILES))
+    return CAPACITY_PROFILES[name]
+
+def uses_mixed_instances(profile: dict) -> bool:
+    return len(profile['instance_types']) > 1 or 'on_demand_percentage_above_base_capacity' in profile
@@ -0,0 +1,112 @@
+from aws_cdk import (
+    aws_certificatemanager as acm,
+    aws_cloudfront as cloudfront,
+    aws_cloudfront_origins as origins,
+    aws_route53 as r53,
+    aws_route53_targets as r53_targets,
+    core
+)
+
+# The ALB listener rule only forwards requests carrying this header with the site's origin secret
+ORIGIN_VERIFY_HEADER = 'X-Origin-Verify'
+
+# Values used for any setting a site's cdn object does not declare, durations in seconds
+CDN_DEFAULTS = {
+    'default_ttl': 3600,
+    'min_ttl': 0,
+    'max_ttl': 86400,
+    'compress': True,
+    'query_strings': 'all', # all or none, part of the cache key and forwarded to IIS
+    'keepalive_timeout': 5,
+    'read_timeout': 30,
+    'price_class': '100' # 100, 200 or all
+}
+
+PRICE_CLASSES = {
+    '100': cloudfront.PriceClass.PRICE_CLASS_100,
+    '200': cloudfront.PriceClass.PRICE_CLASS_200,
+    'all': cloudfront.PriceClass.PRICE_CLASS_ALL
+}
+
+def origin_sub_domain(sub_domain: str) -> str:
+    # CloudFront reaches the ALB through this record, the ALB's wildcard certificate covers it
+    return 'origin-' + sub_domain
+
+class CdkEcsWindowsFSXCdn(core.Stack):
+
+    # Deployed to us-east-1, CloudFront only uses certificates from there
+    def __init__(self, scope: core.Construct, id: str, hosted_zone_id: str, zone_name: str, sub_domain: str, origin_secret_name: str, cdn: dict = None, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # check context values
+        for v in [sub_domain, hosted_zone_id, zone_name]:
+            if v == '':
+                raise Exception("Please provide required parameters sub_domain, hosted_zone_id, zone_name via context variables")
+
+        settings = dict(CDN_DEFAULTS)
+        settings.update(cdn or {})
+        if settings['query_strings'] not in ('all', 'none'):
+            raise Exception("CDN query_strings must be all or none")
+        if settings['price_class'] not in PRICE_CLASSES:
+            raise Exception("CDN price_class must be one of " + ", ".join(PRICE_CLASSES))
+        if not settings['min_ttl'] <= settings['default_ttl'] <= settings['max_ttl']:
+            raise Exception("CDN TTLs must satisfy min_ttl <= default_ttl <= max_ttl")
+
+        # configure zone
+        domain_zone = r53.PublicHostedZone.from_hosted_zone_attributes(self, "hosted_zone",
+            hosted_zone_id=hosted_zone_id,
+            zone_name=zone_name
+        )
+        domain_name = sub_domain + "." + zone_name
+
+        certificate = acm.Certificate(self, "Certificate",
+            domain_name=domain_name,
+            validation=acm.CertificateValidation.from_dns(domain_zone)
+        )
+
+        # Cache Policy - Mostly static content, cookies and headers aren't part of the cache key
+        cache_policy = cloudfront.CachePolicy(self, "CachePolicy",
+            default_ttl=core.Duration.seconds(settings['default_ttl']),
+            min_ttl=core.Duration.seconds(settings['min_ttl']),
+            max_ttl=core.Duration.seconds(settings['max_ttl']),
+            enable_accept_encoding_gzip=settings['compress'],
+            enable_accept_encoding_brotli=settings['compress'],
+            query_string_behavior=cloudfront.CacheQueryStringBehavior.all() if settings['query_strings'] == 'all' else cloudfront.CacheQueryStringBehavior.none(),
+            cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+            header_behavior=cloudfront.CacheHeaderBehavior.none()
+        )
+
+        # Origin - The secret is replicated to this region by the website stack, CloudFormation resolves it at deploy time
+        origin = origins.HttpOrigin(origin_sub_domain(sub_domain) + "." + zone_name,
+            protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY,
+            keepalive_timeout=core.Duration.seconds(settings['keepalive_timeout']),
+            read_timeout=core.Duration.seconds(settings['read_timeout']),
+            custom_headers={
+                ORIGIN_VERIFY_HEADER: '{{resolve:secretsmanager:' + origin_secret_name + ':SecretString}}'
+            }
+        )
+
+        distribution = cloudfront.Distribution(self, "Distribution",
+            default_behavior=cloudfront.BehaviorOptions(
+                origin=origin,
+                cache_policy=cache_policy,
+                compress=settings['compress'],
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS
+            ),
+            domain_names=[domain_name],
+            certificate=certificate,
+            price_class=PRICE_CLASSES[settings['price_class']],
+            http_version=cloudfront.HttpVersion.HTTP2
+        )
+
+        # DNS - Point the site sub domain at the distribution
+        r53.ARecord(self, "AliasRecord",
+            zone=domain_zone,
+            record_name=sub_domain,
+            target=r53.RecordTarget.from_alias(r53_targets.CloudFrontTarget(distribution))
+        )
+
+        core.CfnOutput(self, "DistributionDomainName",
+            value=distribution.distribution_domain_name
+        )
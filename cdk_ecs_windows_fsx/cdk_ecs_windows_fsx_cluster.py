@@ -7,175 +7,280 @@ from aws_cdk import (
     aws_ecs_patterns as ecs_patterns,
     aws_ecr as ecr,
     aws_logs as logs,
-    aws_secretsmanager as secretsmanager,
-    aws_directoryservice as mad,
-    aws_fsx as fsx,
     core
 )
-import simplejson as json
+from capacity_profiles import get_capacity_profile, uses_mixed_instances
+from capacity_planner import WINDOWS_RESERVED_MEMORY_MIB
+from scaling_schedules import scheduled_actions
 
 
 class CdkEcsWindowsFSXCluster(core.Stack):
 
-    def __init__(self, scope: core.Construct, id: str, **kwargs) -> None:
+    # Compute only - The VPC and security groups, Managed AD and FSx live in the network, directory and storage stacks
+    def __init__(self, scope: core.Construct, id: str, vpc: ec2.Vpc, hosts_sg: ec2.SecurityGroup, mad_secret_name: str, min_capacity: int = 2, max_capacity: int = 2, target_capacity_percent: int = None, image: str = 'microsoft/iis', image_mirror: dict = None, ami_id: str = None, warm_pool: dict = None, capacity_profile: str = 'burstable', container_insights: bool = True, reserved_memory_mib: int = WINDOWS_RESERVED_MEMORY_MIB, scaling_schedule: list = None, schedule_timezone: str = 'UTC', predictive_scaling: dict = None, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         # setup for pseudo parameters
         stack = core.Stack.of(self)
 
-        # New VPC
-        vpc = ec2.Vpc(self, "Vpc",
-            max_azs=2,
-            nat_gateways=2,
-            subnet_configuration=[
-                {
-                    'name': 'public',
-                    'subnetType': ec2.SubnetType.PUBLIC,
-                    'cidrMask': 24,
-                    'reserved': False,
-                },
-                {
-                    'name': 'private',
-                    'subnetType': ec2.SubnetType.PRIVATE,
-                    'cidrMask': 24,
-                    'reserved': False,
-                },
-                {
-                    'name': 'isolated',
-                    'subnetType': ec2.SubnetType.ISOLATED,
-                    'cidrMask': 24,
-                    'reserved': True,
-                }
-            ]
-        )
+        ## ECS 
+        # Launch from the pre-baked golden AMI when given (see CdkEcsWindowsFSXImage), otherwise the latest ECS-optimized Windows AMI
+        if ami_id is not None:
+            machine_image = ec2.MachineImage.generic_windows({stack.region: ami_id})
+        else:
+            machine_image = ec2.MachineImage.from_ssm_parameter(
+                parameter_name='/aws/service/ami-windows-latest/Windows_Server-2019-English-Core-ECS_Optimized/image_id',
+                os=ec2.OperatingSystemType.WINDOWS
+            )
 
-        ## Secrets Manager - Generate Managed Active Directory Admin Credentials
-        domain_name='example.aws' ## Managed AD domain name
-        mad_password_object = {'Domain': domain_name, 'username': 'Admin'}
-        self.MADSecret = secretsmanager.Secret(self,"MADSecret",
-            generate_secret_string=secretsmanager.SecretStringGenerator(
-                secret_string_template=json.dumps(mad_password_object),
-                generate_string_key='Password',
-                exclude_punctuation=True,
-            ),
-            secret_name="MADSecret"
-        )
+        # Capacity Profile - Instance types and On-Demand/Spot split for the cluster hosts, see capacity_profiles.py
+        profile = get_capacity_profile(capacity_profile)
+        mixed_instances = uses_mixed_instances(profile)
+        if mixed_instances and warm_pool is not None:
+            raise Exception("Warm pools can't be used with a mixed instances policy, choose a single instance type On-Demand capacity profile such as burstable")
+        instance_type = ec2.InstanceType(profile['instance_types'][0])
 
-        ## ECS 
         cluster = ecs.Cluster(self, "cluster",
             vpc=vpc,
-            capacity=ecs.AddCapacityOptions(
-                instance_type=ec2.InstanceType.of(ec2.InstanceClass.BURSTABLE3, ec2.InstanceSize.MEDIUM),
-                machine_image=ec2.MachineImage.from_ssm_parameter(
-                    parameter_name='/aws/service/ami-windows-latest/Windows_Server-2019-English-Core-ECS_Optimized/image_id',
-                    os=ec2.OperatingSystemType.WINDOWS
-                ),
-                min_capacity=2,
-                max_capacity=2
-            )
+            container_insights=container_insights
         )
 
-        # Edit Launch Config for the ECS Cluster Hosts via an Escape Hatch to insert correct Windows UserData
-        launchConfig = cluster.node.find_child('DefaultAutoScalingGroup').node.find_child('LaunchConfig')
+        # Cluster Hosts - In the network stack's hosts security group, which the FSx, endpoint and bastion rules already allow
+        asg = autoscaling.AutoScalingGroup(cluster, 'DefaultAutoScalingGroup',
+            vpc=vpc,
+            instance_type=instance_type,
+            machine_image=machine_image,
+            min_capacity=min_capacity,
+            max_capacity=max_capacity,
+            security_group=hosts_sg
+        )
+        cluster.add_auto_scaling_group(asg)
+
+        # Windows UserData for the ECS Cluster Hosts - runs on every boot, joins the domain once then reboots
+        # With a warm pool the launch lifecycle hook is completed once the host is domain joined, both when it is
+        # prepared for the pool and when it later leaves the pool
+        launch_hook_name = 'DomainJoined'
         userDataScript = '<powershell> \n'
         userDataScript += 'Import-Module ECSTools \n' 
+        userDataScript += '[Environment]::SetEnvironmentVariable("ECS_IMAGE_PULL_BEHAVIOR", "prefer-cached", "Machine") \n' # Restarted tasks start from the local image cache
+        userDataScript += '[Environment]::SetEnvironmentVariable("ECS_RESERVED_MEMORY", "' + str(reserved_memory_mib) + '", "Machine") \n' # Keep memory for Windows, the same figure the capacity plan uses
+        if 'spot_allocation_strategy' in profile:
+            userDataScript += '[Environment]::SetEnvironmentVariable("ECS_ENABLE_SPOT_INSTANCE_DRAINING", "true", "Machine") \n' # Drain tasks on Spot interruption notices
+        if warm_pool is not None:
+            userDataScript += '[Environment]::SetEnvironmentVariable("ECS_WARM_POOLS_CHECK", "true", "Machine") \n' # Don't register with the cluster while in the warm pool
         userDataScript += 'Initialize-ECSAgent -Cluster ' + cluster.cluster_name + ' -EnableTaskIAMRole \n' 
-        userDataScript += '[string]$SecretAD  = "' + self.MADSecret.secret_name + '" \n'
+        userDataScript += 'if ((Get-WmiObject Win32_ComputerSystem).PartOfDomain -ne $true) { \n'
+        userDataScript += '[string]$SecretAD  = "' + mad_secret_name + '" \n'
         userDataScript += '$SecretObj = Get-SECSecretValue -SecretId $SecretAD \n'
         userDataScript += '[PSCustomObject]$Secret = ($SecretObj.SecretString  | ConvertFrom-Json) \n'
         userDataScript += '$password   = $Secret.Password | ConvertTo-SecureString -asPlainText -Force \n'
         userDataScript += '$username   = $Secret.username + "@" + $Secret.Domain \n'
         userDataScript += '$credential = New-Object System.Management.Automation.PSCredential($username,$password) \n'
         userDataScript += 'Add-Computer -DomainName $Secret.Domain -Credential $credential -Restart -Force \n'
+        userDataScript += '} \n'
+        if warm_pool is not None:
+            userDataScript += 'else { \n'
+            userDataScript += '$InstanceId = Get-EC2InstanceMetadata -Category InstanceId \n'
+            userDataScript += '$AsgName = (Get-EC2Tag -Filter @{Name="resource-id";Values=$InstanceId},@{Name="key";Values="aws:autoscaling:groupName"}).Value \n'
+            userDataScript += 'try { Complete-ASLifecycleAction -LifecycleHookName ' + launch_hook_name + ' -AutoScalingGroupName $AsgName -InstanceId $InstanceId -LifecycleActionResult CONTINUE } catch { Write-Output "No pending lifecycle action" } \n'
+            userDataScript += '} \n'
         userDataScript += '</powershell> \n'
         userDataScript += '<persist>true</persist>'
 
-        launchConfig.add_property_override('UserData', core.Fn.base64(userDataScript))
+        ## Launch Template - Replaces the Launch Configuration CDK creates for the ASG (required for warm pools), via an Escape Hatch
+        # Hibernated warm pools need hibernation enabled and an encrypted root volume
+        hibernated = warm_pool is not None and warm_pool.get('pool_state') == 'Hibernated'
+        launch_template_data = ec2.CfnLaunchTemplate.LaunchTemplateDataProperty(
+            image_id=machine_image.get_image(self).image_id,
+            instance_type=instance_type.to_string(),
+            iam_instance_profile=ec2.CfnLaunchTemplate.IamInstanceProfileProperty(
+                arn=asg.node.find_child('InstanceProfile').attr_arn
+            ),
+            security_group_ids=[sg.security_group_id for sg in asg.connections.security_groups],
+            user_data=core.Fn.base64(userDataScript),
+            credit_specification=ec2.CfnLaunchTemplate.CreditSpecificationProperty(cpu_credits=profile['cpu_credits']) if 'cpu_credits' in profile else None,
+            hibernation_options=ec2.CfnLaunchTemplate.HibernationOptionsProperty(configured=True) if hibernated else None,
+            block_device_mappings=[
+                ec2.CfnLaunchTemplate.BlockDeviceMappingProperty(
+                    device_name='/dev/sda1',
+                    ebs=ec2.CfnLaunchTemplate.EbsProperty(encrypted=True)
+                )
+            ] if hibernated else None
+        )
+        launch_template = ec2.CfnLaunchTemplate(self, 'LaunchTemplate',
+            launch_template_data=launch_template_data
+        )
 
-        # Export Cluster for consumption in website stacks
-        self.cluster = cluster
+        cfn_asg = asg.node.default_child
+        cfn_asg.add_property_deletion_override('LaunchConfigurationName')
+        launch_template_specification = {
+            'LaunchTemplateId': launch_template.ref,
+            'Version': launch_template.attr_latest_version_number
+        }
+        if mixed_instances:
+            # Mixed Instances Policy - Any of the profile's instance types, split between On-Demand and Spot
+            instances_distribution = {}
+            for key, cfn_key in [
+                ('on_demand_base_capacity', 'OnDemandBaseCapacity'),
+                ('on_demand_percentage_above_base_capacity', 'OnDemandPercentageAboveBaseCapacity'),
+                ('spot_allocation_strategy', 'SpotAllocationStrategy')
+            ]:
+                if key in profile:
+                    instances_distribution[cfn_key] = profile[key]
+            cfn_asg.add_property_override('MixedInstancesPolicy', {
+                'LaunchTemplate': {
+                    'LaunchTemplateSpecification': launch_template_specification,
+                    'Overrides': [{'InstanceType': t} for t in profile['instance_types']]
+                },
+                'InstancesDistribution': instances_distribution
+            })
+        else:
+            cfn_asg.add_property_override('LaunchTemplate', launch_template_specification)
+        asg.node.try_remove_child('LaunchConfig')
 
-        ## Managed Active Directory        
-        # Grant ECS Cluster Instances permission to Secrets Manager MADSecret - metadata path cdk-ecs-windows-cluster/cluster/DefaultAutoScalingGroup/InstanceRole/Resource
-        ecs_instance_role = cluster.node.find_child('DefaultAutoScalingGroup').node.find_child('InstanceRole')
-        # Grant permission to access the MAD secret
-        ecs_instance_role.add_managed_policy(policy=iam.ManagedPolicy.from_managed_policy_arn(self, 'MP1', 'arn:aws:iam::aws:policy/SecretsManagerReadWrite'))
-        # Grant permissions to enable Systems Manager to manage ECS Hosts
-        ecs_instance_role.add_managed_policy(policy=iam.ManagedPolicy.from_managed_policy_arn(self, 'MP2', 'arn:aws:iam::aws:policy/AmazonSSMManagedInstanceCore'))
-        
-        # Find Private subnets of the VPC
-        private_subnets = vpc.select_subnets(subnet_type= ec2.SubnetType.PRIVATE).subnet_ids
-        
-        # Set Managed Active Directory VPC and Subnet config
-        vpcSettings = mad.CfnMicrosoftAD.VpcSettingsProperty(subnet_ids=private_subnets,vpc_id=vpc.vpc_id)
-        
-        # Launch Managed Active Directory
-        ad = mad.CfnMicrosoftAD(self,'MAD',
-            name=domain_name,
-            password=self.MADSecret.secret_value_from_json('Password').to_string(),
-            vpc_settings=vpcSettings,
-            edition='Standard'
-        )
+        ## Warm Pool - Pre-initialized (domain joined) stopped or hibernated hosts so scale-out takes seconds
+        # https://docs.aws.amazon.com/autoscaling/ec2/userguide/ec2-auto-scaling-warm-pools.html
+        if warm_pool is not None:
+            # Launch hook on the ASG itself so the initial instances wait for the domain join too
+            cfn_asg.add_property_override('LifecycleHookSpecificationList', [
+                {
+                    'LifecycleHookName': launch_hook_name,
+                    'LifecycleTransition': 'autoscaling:EC2_INSTANCE_LAUNCHING',
+                    'HeartbeatTimeout': warm_pool.get('heartbeat_timeout', 1800),
+                    'DefaultResult': 'ABANDON'
+                }
+            ])
+            asg.add_to_role_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    'autoscaling:CompleteLifecycleAction'
+                ],
+                resources=[
+                    asg.auto_scaling_group_arn
+                ]
+            ))
+            asg.add_to_role_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    'ec2:DescribeTags'
+                ],
+                resources=['*']
+            ))
 
-        # Collect the IPs of the two created Domain Controllers
-        ad_dns_ip1 = core.Fn.select(0,ad.attr_dns_ip_addresses)
-        ad_dns_ip2 = core.Fn.select(1,ad.attr_dns_ip_addresses)
+            warm_pool_properties = {
+                'AutoScalingGroupName': asg.auto_scaling_group_name,
+                'MinSize': warm_pool.get('min_size', 0),
+                'PoolState': warm_pool.get('pool_state', 'Stopped')
+            }
+            if 'max_group_prepared_capacity' in warm_pool:
+                warm_pool_properties['MaxGroupPreparedCapacity'] = warm_pool['max_group_prepared_capacity']
+            core.CfnResource(self, 'WarmPool',
+                type='AWS::AutoScaling::WarmPool',
+                properties=warm_pool_properties
+            )
 
-        ## FSx
-        # Create a Security Group for FSx
-        fsx_sg = ec2.SecurityGroup(self, 'WindowsFSxSG',
-            vpc=vpc,
-            allow_all_outbound=True
-        )
-        core.Tags.of(fsx_sg).add('Name',stack.stack_name + '_FSx')
-
-        # Allow ECS Cluster to Connect to FSx Hosts
-        fsx_sg.connections.allow_from(cluster.connections, ec2.Port.tcp(445), 'ECS Cluster')
-        fsx_sg.connections.allow_from(cluster.connections, ec2.Port.tcp(5985), 'ECS Cluster')
-
-        # Create FSx
-        FSxSize = 32 # GB (32 GB min)
-        FSxMBps = 8 # MB/s (8 MB/s min)
-        windows_fsx = fsx.CfnFileSystem(self, 'WindowsFSx', file_system_type='WINDOWS',subnet_ids=private_subnets,
-            windows_configuration=fsx.CfnFileSystem.WindowsConfigurationProperty(
-                active_directory_id=ad.ref,
-                throughput_capacity=FSxMBps,
-                preferred_subnet_id=private_subnets[0],
-                deployment_type="MULTI_AZ_1"
-            ),
-            storage_capacity=FSxSize,
-            security_group_ids=[fsx_sg.security_group_id]
-        )
+        ## Scheduled Scaling - Windows hosts take many minutes to join the domain and pull images, so raise the bounds ahead of known peaks
+        # Windows come validated from scaling_schedules.get_schedule, each one starts and ends with a scheduled action
+        for name, cron, window_min, window_max, window_desired in scheduled_actions(scaling_schedule or [], min_capacity, max_capacity):
+            scheduled_action = asg.scale_on_schedule('Schedule-' + name,
+                schedule=autoscaling.Schedule.cron(**cron),
+                min_capacity=window_min,
+                max_capacity=window_max,
+                desired_capacity=window_desired
+            )
+            scheduled_action.node.default_child.add_property_override('TimeZone', schedule_timezone)
 
-        ## DHCP Options - Configure VPC DNS to use MAD
-        dhcp_options = ec2.CfnDHCPOptions(self, 'DHCPOptions',
-            domain_name=ad.name,
-            domain_name_servers=[ad_dns_ip1,ad_dns_ip2],
-            ntp_servers=["169.254.169.123"]
-        )
+        ## Predictive Scaling - Forecast host capacity from the ASG's CPU history, launching hosts scheduling_buffer ahead of the forecast
+        # ForecastOnly (default) only publishes the forecast so it can be compared with the actual load before letting it scale
+        # https://docs.aws.amazon.com/autoscaling/ec2/userguide/ec2-auto-scaling-predictive-scaling.html
+        if predictive_scaling is not None:
+            core.CfnResource(self, 'PredictiveScalingPolicy',
+                type='AWS::AutoScaling::ScalingPolicy',
+                properties={
+                    'AutoScalingGroupName': asg.auto_scaling_group_name,
+                    'PolicyType': 'PredictiveScaling',
+                    'PredictiveScalingConfiguration': {
+                        'MetricSpecifications': [
+                            {
+                                'TargetValue': predictive_scaling.get('cpu_target_percent', 50),
+                                'PredefinedMetricPairSpecification': {
+                                    'PredefinedMetricType': 'ASGCPUUtilization'
+                                }
+                            }
+                        ],
+                        'Mode': predictive_scaling.get('mode', 'ForecastOnly'),
+                        'SchedulingBufferTime': predictive_scaling.get('buffer_minutes', 30) * 60,
+                        'MaxCapacityBreachBehavior': 'HonorMaxCapacity'
+                    }
+                }
+            )
 
-        ec2.CfnVPCDHCPOptionsAssociation(self, 'DHCPOptionsAssoc',
-            vpc_id=vpc.vpc_id, 
-            dhcp_options_id=dhcp_options.ref
-        )
+        # Export Cluster for consumption in website stacks
+        self.cluster = cluster
 
-        ## Bastion Security Group - Created here to avoid a circular dependency
-        self.bastion_sg = ec2.SecurityGroup(self, 'BastionSG',
-            vpc=vpc,
-            allow_all_outbound=True
-        )
-        core.Tags.of(self.bastion_sg).add('Name',stack.stack_name + '_Bastion')
+        ## Capacity Provider - Let ECS managed scaling grow the ASG with pending tasks
+        self.capacity_provider_name = None
+        if target_capacity_percent is not None:
+            capacity_provider = ecs.CfnCapacityProvider(self, 'CapacityProvider',
+                name=stack.stack_name + '-capacity', # Explicit name so website stacks can reference it from property overrides
+                auto_scaling_group_provider=ecs.CfnCapacityProvider.AutoScalingGroupProviderProperty(
+                    # The group name, the ARN CDK builds for the group has a * in place of its id which ECS rejects
+                    auto_scaling_group_arn=asg.auto_scaling_group_name,
+                    managed_scaling=ecs.CfnCapacityProvider.ManagedScalingProperty(
+                        status='ENABLED',
+                        target_capacity=target_capacity_percent,
+                        minimum_scaling_step_size=1,
+                        maximum_scaling_step_size=max_capacity
+                    ),
+                    managed_termination_protection='DISABLED'
+                )
+            )
 
-        # Allow access to FSx/Cluster from Bastion Server # https://docs.aws.amazon.com/FSx/latest/WindowsGuide/limit-access-security-groups.html
-        fsx_sg.add_ingress_rule(self.bastion_sg, ec2.Port.tcp(445), 'Bastion')
-        fsx_sg.add_ingress_rule(self.bastion_sg, ec2.Port.tcp(5985), 'Bastion')
-        cluster.connections.allow_from(self.bastion_sg, ec2.Port.tcp(3389), 'Bastion')
+            # Associate via the standalone resource, setting CapacityProviders on the cluster itself would be circular (UserData references the cluster)
+            # https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/aws-resource-ecs-clustercapacityproviderassociations.html
+            core.CfnResource(self, 'CapacityProviderAssociations',
+                type='AWS::ECS::ClusterCapacityProviderAssociations',
+                properties={
+                    'Cluster': cluster.cluster_name,
+                    'CapacityProviders': [capacity_provider.ref],
+                    'DefaultCapacityProviderStrategy': [
+                        {
+                            'CapacityProvider': capacity_provider.ref,
+                            'Weight': 1
+                        }
+                    ]
+                }
+            )
+            self.capacity_provider_name = capacity_provider.name
 
-        # Allow access to Bastion from your home/office IP range (Update with your home/office IP)
-        #self.bastion_sg.add_ingress_rule(ec2.Peer.ipv4('0.0.0.0/0'), ec2.Port.tcp(3389), 'Access from Internet RDP')
+        ## ECR Mirror - Pull the multi-GB Windows image layers from a private ECR repository through a pull through cache rule
+        # https://docs.aws.amazon.com/AmazonECR/latest/userguide/pull-through-cache.html
+        self.image = image
+        self.image_repository_arn = None
+        if image_mirror is not None:
+            repository_prefix = image_mirror.get('repository_prefix', 'docker-hub')
+            pull_through_cache_properties = {
+                'EcrRepositoryPrefix': repository_prefix,
+                'UpstreamRegistryUrl': image_mirror.get('upstream_registry_url', 'registry-1.docker.io')
+            }
+            # Docker Hub requires credentials stored in a Secrets Manager secret prefixed ecr-pullthroughcache/
+            if 'credential_arn' in image_mirror:
+                pull_through_cache_properties['CredentialArn'] = image_mirror['credential_arn']
+            core.CfnResource(self, 'ImagePullThroughCacheRule',
+                type='AWS::ECR::PullThroughCacheRule',
+                properties=pull_through_cache_properties
+            )
+            self.image = stack.account + '.dkr.ecr.' + stack.region + '.' + stack.url_suffix + '/' + repository_prefix + '/' + image
+            self.image_repository_arn = stack.format_arn(service='ecr', resource='repository', resource_name=repository_prefix + '/*')
 
+        ## Cluster Host Permissions
+        # Grant ECS Cluster Instances permission to Secrets Manager MADSecret - metadata path cdk-ecs-windows-cluster/cluster/DefaultAutoScalingGroup/InstanceRole/Resource
+        ecs_instance_role = asg.node.find_child('InstanceRole')
+        # Grant permission to access the MAD secret
+        ecs_instance_role.add_managed_policy(policy=iam.ManagedPolicy.from_managed_policy_arn(self, 'MP1', 'arn:aws:iam::aws:policy/SecretsManagerReadWrite'))
+        # Grant permissions to enable Systems Manager to manage ECS Hosts
+        ecs_instance_role.add_managed_policy(policy=iam.ManagedPolicy.from_managed_policy_arn(self, 'MP2', 'arn:aws:iam::aws:policy/AmazonSSMManagedInstanceCore'))
+        
         # Export Values to be consumed by other stacks
         self.vpc = vpc
-        self.file_system_id = windows_fsx.ref
-        self.mad_secret_arn = self.MADSecret.secret_arn
-        self.mad_domain_name = domain_name
+        self.auto_scaling_group_name = asg.auto_scaling_group_name
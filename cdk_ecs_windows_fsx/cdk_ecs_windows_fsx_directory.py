@@ -0,0 +1,104 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_secretsmanager as secretsmanager,
+    aws_directoryservice as mad,
+    aws_route53resolver as resolver,
+    core
+)
+import simplejson as json
+
+DNS_MODES = ['directory', 'resolver']
+
+
+class CdkEcsWindowsFSXDirectory(core.Stack):
+
+    # Managed AD takes the bulk of a fresh deployment, kept apart so compute, storage and site changes never touch it
+    def __init__(self, scope: core.Construct, id: str, vpc: ec2.Vpc, private_subnet_ids: list, dns_mode: str = 'directory', **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        if dns_mode not in DNS_MODES:
+            raise Exception("Unknown dns_mode '" + dns_mode + "', expected one of: " + ", ".join(DNS_MODES))
+
+        # setup for pseudo parameters
+        stack = core.Stack.of(self)
+
+        ## Secrets Manager - Generate Managed Active Directory Admin Credentials
+        domain_name='example.aws' ## Managed AD domain name
+        mad_password_object = {'Domain': domain_name, 'username': 'Admin'}
+        self.MADSecret = secretsmanager.Secret(self,"MADSecret",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                secret_string_template=json.dumps(mad_password_object),
+                generate_string_key='Password',
+                exclude_punctuation=True,
+            ),
+            secret_name="MADSecret"
+        )
+
+        # Set Managed Active Directory VPC and Subnet config
+        vpcSettings = mad.CfnMicrosoftAD.VpcSettingsProperty(subnet_ids=private_subnet_ids,vpc_id=vpc.vpc_id)
+
+        # Launch Managed Active Directory
+        ad = mad.CfnMicrosoftAD(self,'MAD',
+            name=domain_name,
+            password=self.MADSecret.secret_value_from_json('Password').to_string(),
+            vpc_settings=vpcSettings,
+            edition='Standard'
+        )
+
+        # Collect the IPs of the two created Domain Controllers
+        ad_dns_ip1 = core.Fn.select(0,ad.attr_dns_ip_addresses)
+        ad_dns_ip2 = core.Fn.select(1,ad.attr_dns_ip_addresses)
+
+        ## DHCP Options - Configure VPC DNS
+        # directory: the domain controllers resolve every name in the VPC, including ECR, S3 and Secrets Manager lookups
+        # resolver: AmazonProvidedDNS stays the VPC resolver and only the AD domain is forwarded to the domain controllers
+        # through a Route 53 Resolver outbound endpoint, so the domain controllers only see AD traffic
+        dhcp_options = ec2.CfnDHCPOptions(self, 'DHCPOptions',
+            domain_name=ad.name,
+            domain_name_servers=[ad_dns_ip1,ad_dns_ip2] if dns_mode == 'directory' else ['AmazonProvidedDNS'],
+            ntp_servers=["169.254.169.123"]
+        )
+
+        if dns_mode == 'resolver':
+            resolver_sg = ec2.SecurityGroup(self, 'ResolverEndpointSG',
+                vpc=vpc,
+                allow_all_outbound=False
+            )
+            core.Tags.of(resolver_sg).add('Name',stack.stack_name + '_ResolverEndpoint')
+            resolver_sg.add_egress_rule(ec2.Peer.ipv4(vpc.vpc_cidr_block), ec2.Port.tcp(53), 'Managed AD DNS')
+            resolver_sg.add_egress_rule(ec2.Peer.ipv4(vpc.vpc_cidr_block), ec2.Port.udp(53), 'Managed AD DNS')
+
+            # The endpoint needs an address in two subnets, one per AZ like the domain controllers
+            outbound_endpoint = resolver.CfnResolverEndpoint(self, 'ResolverOutboundEndpoint',
+                direction='OUTBOUND',
+                ip_addresses=[resolver.CfnResolverEndpoint.IpAddressRequestProperty(subnet_id=subnet_id) for subnet_id in private_subnet_ids],
+                security_group_ids=[resolver_sg.security_group_id],
+                name=stack.stack_name + '-outbound'
+            )
+
+            forward_rule = resolver.CfnResolverRule(self, 'ResolverForwardRule',
+                domain_name=domain_name,
+                rule_type='FORWARD',
+                resolver_endpoint_id=outbound_endpoint.attr_resolver_endpoint_id,
+                target_ips=[
+                    resolver.CfnResolverRule.TargetAddressProperty(ip=ad_dns_ip1, port='53'),
+                    resolver.CfnResolverRule.TargetAddressProperty(ip=ad_dns_ip2, port='53')
+                ],
+                name=stack.stack_name + '-forward-ad'
+            )
+
+            resolver.CfnResolverRuleAssociation(self, 'ResolverForwardRuleAssoc',
+                resolver_rule_id=forward_rule.attr_resolver_rule_id,
+                vpc_id=vpc.vpc_id
+            )
+
+        ec2.CfnVPCDHCPOptionsAssociation(self, 'DHCPOptionsAssoc',
+            vpc_id=vpc.vpc_id,
+            dhcp_options_id=dhcp_options.ref
+        )
+
+        # Export Values to be consumed by other stacks
+        self.directory_id = ad.ref
+        self.mad_secret_arn = self.MADSecret.secret_arn
+        self.mad_secret_name = self.MADSecret.secret_name
+        self.mad_domain_name = domain_name
@@ -0,0 +1,145 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_imagebuilder as imagebuilder,
+    core
+)
+import hashlib
+import simplejson as json
+
+
+def content_version(*parts) -> str:
+    # Image Builder components and recipes are immutable per version, derive the patch version from their content
+    # so any change deploys as a new version instead of failing the stack update
+    digest = hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+    return '1.0.' + str(int(digest[:7], 16))
+
+
+class CdkEcsWindowsFSXImage(core.Stack):
+
+    def __init__(self, scope: core.Construct, id: str, image: str = 'microsoft/iis', instance_type: str = 't3.large', subnet_id: str = None, schedule: str = 'cron(0 0 ? * sun *)', **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # setup for pseudo parameters
+        stack = core.Stack.of(self)
+
+        ## Build Instance Role
+        role = iam.Role(self, 'ImageBuilderRole',
+            assumed_by=iam.ServicePrincipal('ec2.amazonaws.com'),
+            managed_policies=[
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'MP1', 'arn:aws:iam::aws:policy/AmazonSSMManagedInstanceCore'),
+                iam.ManagedPolicy.from_managed_policy_arn(self, 'MP2', 'arn:aws:iam::aws:policy/EC2InstanceProfileForImageBuilder')
+            ]
+        )
+        instance_profile = iam.CfnInstanceProfile(self, 'ImageBuilderInstanceProfile',
+            roles=[role.role_name]
+        )
+
+        ## Component - Everything a cluster host otherwise does on each boot that doesn't depend on the cluster or domain
+        component_document = {
+            'schemaVersion': 1.0,
+            'phases': [
+                {
+                    'name': 'build',
+                    'steps': [
+                        {
+                            'name': 'InstallRSAT',
+                            'action': 'ExecutePowerShell',
+                            'inputs': {
+                                'commands': [
+                                    'Install-WindowsFeature RSAT-AD-PowerShell',
+                                    'Install-WindowsFeature RSAT-DNS-Server'
+                                ]
+                            }
+                        },
+                        {
+                            'name': 'ConfigureECSAgent',
+                            'action': 'ExecutePowerShell',
+                            'inputs': {
+                                'commands': [
+                                    '[Environment]::SetEnvironmentVariable("ECS_IMAGE_PULL_BEHAVIOR", "prefer-cached", "Machine")',
+                                    '[Environment]::SetEnvironmentVariable("ECS_ENABLE_TASK_IAM_ROLE", "true", "Machine")'
+                                ]
+                            }
+                        },
+                        {
+                            # Layers are content addressed, so a later pull of the same image from an ECR mirror reuses them
+                            'name': 'PrePullContainerImages',
+                            'action': 'ExecutePowerShell',
+                            'timeoutSeconds': 3600,
+                            'inputs': {
+                                'commands': [
+                                    'docker pull ' + image
+                                ]
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        component_data = json.dumps(component_document)
+
+        component = imagebuilder.CfnComponent(self, 'ECSHostComponent',
+            name=stack.stack_name + '-ecs-host',
+            platform='Windows',
+            version=content_version(component_data),
+            data=component_data
+        )
+
+        ## Recipe - ECS-optimized Windows Server 2019 Core, the same base image the cluster launches from
+        parent_image = ec2.MachineImage.from_ssm_parameter(
+            parameter_name='/aws/service/ami-windows-latest/Windows_Server-2019-English-Core-ECS_Optimized/image_id',
+            os=ec2.OperatingSystemType.WINDOWS
+        ).get_image(self).image_id
+
+        recipe = imagebuilder.CfnImageRecipe(self, 'ECSHostRecipe',
+            name=stack.stack_name + '-ecs-host',
+            version=content_version(component_data, image),
+            parent_image=parent_image,
+            components=[
+                imagebuilder.CfnImageRecipe.ComponentConfigurationProperty(component_arn=component.attr_arn)
+            ],
+            block_device_mappings=[
+                imagebuilder.CfnImageRecipe.InstanceBlockDeviceMappingProperty(
+                    device_name='/dev/sda1',
+                    ebs=imagebuilder.CfnImageRecipe.EbsInstanceBlockDeviceSpecificationProperty(
+                        volume_size=60, # GB, room for the pre-pulled Windows container layers
+                        volume_type='gp3',
+                        delete_on_termination=True
+                    )
+                )
+            ]
+        )
+
+        # Builds run in the default VPC unless a subnet is given (the cluster VPC can't be used as the cluster depends on this stack)
+        infrastructure = imagebuilder.CfnInfrastructureConfiguration(self, 'ECSHostInfrastructure',
+            name=stack.stack_name + '-ecs-host',
+            instance_profile_name=instance_profile.ref,
+            instance_types=[instance_type],
+            subnet_id=subnet_id,
+            terminate_instance_on_failure=True
+        )
+
+        # Image - Built during deployment, this is the AMI the cluster launches from
+        golden_image = imagebuilder.CfnImage(self, 'ECSHostImage',
+            image_recipe_arn=recipe.attr_arn,
+            infrastructure_configuration_arn=infrastructure.attr_arn
+        )
+
+        # Pipeline - Rebuilds on a schedule to pick up Windows and ECS agent updates, point the cluster ami_id context value at a newer AMI to roll it out
+        imagebuilder.CfnImagePipeline(self, 'ECSHostPipeline',
+            name=stack.stack_name + '-ecs-host',
+            image_recipe_arn=recipe.attr_arn,
+            infrastructure_configuration_arn=infrastructure.attr_arn,
+            schedule=imagebuilder.CfnImagePipeline.ScheduleProperty(
+                schedule_expression=schedule,
+                pipeline_execution_start_condition='EXPRESSION_MATCH_AND_DEPENDENCY_UPDATES_AVAILABLE'
+            )
+        )
+
+        core.CfnOutput(self, "ECSHostImageId",
+            value=golden_image.attr_image_id
+        )
+
+        # Export Values to be consumed by other stacks
+        self.image_id = golden_image.attr_image_id
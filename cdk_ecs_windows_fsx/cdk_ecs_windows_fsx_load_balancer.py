@@ -0,0 +1,68 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_ecs as ecs,
+    aws_elasticloadbalancingv2 as elbv2,
+    aws_certificatemanager as acm,
+    aws_route53 as r53,
+    core
+)
+from alb_tuning import get_load_balancer_settings
+
+class CdkEcsWindowsFSXLoadBalancer(core.Stack):
+
+    def __init__(self, scope: core.Construct, id: str, vpc: ec2.Vpc, cluster: ecs.Cluster, hosted_zone_id: str, zone_name: str, settings: dict = None, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # check context values
+        for v in [hosted_zone_id, zone_name]:
+            if v == '':
+                raise Exception("Please provide required parameters hosted_zone_id, zone_name via context variables")
+
+        # configure zone
+        domain_zone = r53.PublicHostedZone.from_hosted_zone_attributes(self, "hosted_zone",
+            hosted_zone_id=hosted_zone_id,
+            zone_name=zone_name
+        )
+
+        # Wildcard Cert - One certificate covers every site sub domain behind this ALB
+        certificate = acm.Certificate(self, "Certificate",
+            domain_name="*." + zone_name,
+            validation=acm.CertificateValidation.from_dns(domain_zone)
+        )
+
+        # Shared ALB - Idle timeout and HTTP/2 from the load_balancers context value, see alb_tuning.py
+        tuning = get_load_balancer_settings(settings)
+        load_balancer = elbv2.ApplicationLoadBalancer(self, "ALB",
+            vpc=vpc,
+            internet_facing=True,
+            idle_timeout=core.Duration.seconds(tuning['idle_timeout']),
+            http2_enabled=tuning['http2']
+        )
+
+        # Allow the ALB to reach tasks on their dynamic host ports (Windows ephemeral port range)
+        # One rule per ALB, website stacks reference the cluster without its security groups so they don't each add a duplicate
+        load_balancer.connections.allow_to(cluster.connections, ec2.Port.tcp_range(49152, 65535), 'Load balancer to ECS dynamic host ports')
+
+        # HTTPS Listener - Sites add host-header rules, anything else gets a 404
+        https_listener = load_balancer.add_listener("HTTPS",
+            protocol=elbv2.ApplicationProtocol.HTTPS,
+            certificates=[elbv2.ListenerCertificate.from_certificate_manager(certificate)],
+            default_action=elbv2.ListenerAction.fixed_response(404,
+                content_type="text/plain",
+                message_body="Not Found"
+            )
+        )
+
+        # HTTP Listener - Redirect to HTTPS
+        load_balancer.add_listener("HTTP",
+            protocol=elbv2.ApplicationProtocol.HTTP,
+            default_action=elbv2.ListenerAction.redirect(
+                protocol="HTTPS",
+                port="443",
+                permanent=True
+            )
+        )
+
+        # Export Values to be consumed by website stacks
+        self.load_balancer = load_balancer
+        self.https_listener = https_listener
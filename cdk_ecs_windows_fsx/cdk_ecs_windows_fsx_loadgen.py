@@ -0,0 +1,74 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_ecs as ecs,
+    aws_logs as logs,
+    core
+)
+import os
+
+LOADGEN_DEFAULTS = {
+    'stages': ['1m:50', '3m:200'],
+    'mode': 'rps',
+    'max_connections': 256,
+    'timeout': 10,
+    'cpu': 1024,
+    'memory': 2048
+}
+
+
+class CdkEcsWindowsFSXLoadGen(core.Stack):
+
+    # Fargate task running the load generator in loadgen/ against a site, started on demand with the run-task command in the stack outputs
+    def __init__(self, scope: core.Construct, id: str, vpc: ec2.Vpc, private_subnet_ids: list, cluster: ecs.Cluster, url: str, loadgen: dict = None, endpoint_sg: ec2.SecurityGroup = None, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        settings = dict(LOADGEN_DEFAULTS, **(loadgen or {}))
+        if settings['mode'] not in ('rps', 'concurrency'):
+            raise Exception("Unknown load generator mode '" + settings['mode'] + "', expected rps or concurrency")
+
+        # Results are written as one JSON document to stdout and end up in the log group
+        log_group = logs.LogGroup(self, 'LoadGenLogs',
+            retention=logs.RetentionDays.ONE_MONTH,
+            removal_policy=core.RemovalPolicy.DESTROY
+        )
+
+        task_definition = ecs.FargateTaskDefinition(self, 'LoadGenTask',
+            cpu=settings['cpu'],
+            memory_limit_mib=settings['memory']
+        )
+
+        command = [url, '--mode', settings['mode'], '--max-connections', str(settings['max_connections']), '--timeout', str(settings['timeout'])]
+        for stage in settings['stages']:
+            command += ['--stage', stage]
+        task_definition.add_container('loadgen',
+            image=ecs.ContainerImage.from_asset(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'loadgen')),
+            command=command,
+            logging=ecs.LogDrivers.aws_logs(stream_prefix='loadgen', log_group=log_group)
+        )
+
+        # Outbound only, the generator reaches the site through its public name like any client
+        loadgen_sg = ec2.SecurityGroup(self, 'LoadGenSG',
+            vpc=vpc,
+            allow_all_outbound=True
+        )
+        # With VPC endpoints the image pull and the logs go through them, and they only accept the security groups they know
+        # The rule lives in this stack, adding it through endpoint_sg would make the network stack depend on this one
+        if endpoint_sg is not None:
+            ec2.CfnSecurityGroupIngress(self, 'EndpointIngress',
+                group_id=endpoint_sg.security_group_id,
+                source_security_group_id=loadgen_sg.security_group_id,
+                ip_protocol='tcp',
+                from_port=443,
+                to_port=443,
+                description='Load generator'
+            )
+
+        core.CfnOutput(self, 'RunTaskCommand',
+            value=core.Fn.join('', [
+                'aws ecs run-task --launch-type FARGATE --cluster ', cluster.cluster_name,
+                ' --task-definition ', task_definition.task_definition_arn,
+                ' --network-configuration awsvpcConfiguration={subnets=[', core.Fn.join(',', private_subnet_ids),
+                '],securityGroups=[', loadgen_sg.security_group_id, ']}'
+            ])
+        )
+        core.CfnOutput(self, 'LogGroup', value=log_group.log_group_name)
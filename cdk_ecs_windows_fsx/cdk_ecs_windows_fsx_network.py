@@ -0,0 +1,116 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    core
+)
+
+
+class CdkEcsWindowsFSXNetwork(core.Stack):
+
+    def __init__(self, scope: core.Construct, id: str, vpc_endpoints: bool = False, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # setup for pseudo parameters
+        stack = core.Stack.of(self)
+
+        # New VPC
+        vpc = ec2.Vpc(self, "Vpc",
+            max_azs=2,
+            nat_gateways=2,
+            subnet_configuration=[
+                {
+                    'name': 'public',
+                    'subnetType': ec2.SubnetType.PUBLIC,
+                    'cidrMask': 24,
+                    'reserved': False,
+                },
+                {
+                    'name': 'private',
+                    'subnetType': ec2.SubnetType.PRIVATE,
+                    'cidrMask': 24,
+                    'reserved': False,
+                },
+                {
+                    'name': 'isolated',
+                    'subnetType': ec2.SubnetType.ISOLATED,
+                    'cidrMask': 24,
+                    'reserved': True,
+                }
+            ]
+        )
+
+        ## Security Groups - All created here so the storage and compute stacks only reference them and don't depend on each other
+        # ECS Cluster Hosts
+        hosts_sg = ec2.SecurityGroup(self, 'ClusterHostsSG',
+            vpc=vpc,
+            allow_all_outbound=True
+        )
+        core.Tags.of(hosts_sg).add('Name',stack.stack_name + '_ClusterHosts')
+
+        # FSx
+        fsx_sg = ec2.SecurityGroup(self, 'WindowsFSxSG',
+            vpc=vpc,
+            allow_all_outbound=True
+        )
+        core.Tags.of(fsx_sg).add('Name',stack.stack_name + '_FSx')
+
+        # Allow ECS Cluster to Connect to FSx Hosts
+        fsx_sg.add_ingress_rule(hosts_sg, ec2.Port.tcp(445), 'ECS Cluster')
+        fsx_sg.add_ingress_rule(hosts_sg, ec2.Port.tcp(5985), 'ECS Cluster')
+
+        # Bastion
+        bastion_sg = ec2.SecurityGroup(self, 'BastionSG',
+            vpc=vpc,
+            allow_all_outbound=True
+        )
+        core.Tags.of(bastion_sg).add('Name',stack.stack_name + '_Bastion')
+
+        # Allow access to FSx/Cluster from Bastion Server # https://docs.aws.amazon.com/FSx/latest/WindowsGuide/limit-access-security-groups.html
+        fsx_sg.add_ingress_rule(bastion_sg, ec2.Port.tcp(445), 'Bastion')
+        fsx_sg.add_ingress_rule(bastion_sg, ec2.Port.tcp(5985), 'Bastion')
+        hosts_sg.add_ingress_rule(bastion_sg, ec2.Port.tcp(3389), 'Bastion')
+
+        # Allow access to Bastion from your home/office IP range (Update with your home/office IP)
+        #bastion_sg.add_ingress_rule(ec2.Peer.ipv4('0.0.0.0/0'), ec2.Port.tcp(3389), 'Access from Internet RDP')
+
+        ## VPC Endpoints - Keep image layer pulls, logs, secrets, SSM and ECS agent traffic off the NAT gateways
+        endpoint_sg = None
+        if vpc_endpoints:
+            vpc.add_gateway_endpoint('S3Endpoint',
+                service=ec2.GatewayVpcEndpointAwsService.S3,
+                subnets=[ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE)]
+            )
+
+            endpoint_sg = ec2.SecurityGroup(self, 'EndpointSG',
+                vpc=vpc,
+                allow_all_outbound=False
+            )
+            core.Tags.of(endpoint_sg).add('Name',stack.stack_name + '_Endpoints')
+            endpoint_sg.add_ingress_rule(hosts_sg, ec2.Port.tcp(443), 'ECS Cluster')
+            # Private DNS sends the whole VPC to the endpoints, the bastion still needs SSM and Secrets Manager
+            endpoint_sg.add_ingress_rule(bastion_sg, ec2.Port.tcp(443), 'Bastion')
+
+            for endpoint_id, service in [
+                ('ECREndpoint', ec2.InterfaceVpcEndpointAwsService.ECR),
+                ('ECRDockerEndpoint', ec2.InterfaceVpcEndpointAwsService.ECR_DOCKER),
+                ('LogsEndpoint', ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS),
+                ('SecretsManagerEndpoint', ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER),
+                ('SSMEndpoint', ec2.InterfaceVpcEndpointAwsService.SSM),
+                ('ECSEndpoint', ec2.InterfaceVpcEndpointAwsService.ECS),
+                ('ECSAgentEndpoint', ec2.InterfaceVpcEndpointAwsService.ECS_AGENT),
+                ('ECSTelemetryEndpoint', ec2.InterfaceVpcEndpointAwsService.ECS_TELEMETRY)
+            ]:
+                vpc.add_interface_endpoint(endpoint_id,
+                    service=service,
+                    subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE),
+                    security_groups=[endpoint_sg],
+                    private_dns_enabled=True,
+                    open=False # Otherwise the endpoints also accept 443 from the whole VPC CIDR
+                )
+
+        # Export Values to be consumed by other stacks
+        self.vpc = vpc
+        self.private_subnet_ids = vpc.select_subnets(subnet_type=ec2.SubnetType.PRIVATE).subnet_ids
+        self.hosts_sg = hosts_sg
+        self.fsx_sg = fsx_sg
+        self.bastion_sg = bastion_sg
+        self.endpoint_sg = endpoint_sg
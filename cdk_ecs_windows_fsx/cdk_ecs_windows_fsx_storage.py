@@ -0,0 +1,85 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_iam as iam,
+    aws_fsx as fsx,
+    aws_lambda as lambda_,
+    aws_events as events,
+    aws_events_targets as events_targets,
+    core
+)
+import os
+import simplejson as json
+from fsx_profiles import get_fsx_profile
+
+
+class CdkEcsWindowsFSXStorage(core.Stack):
+
+    def __init__(self, scope: core.Construct, id: str, vpc: ec2.Vpc, private_subnet_ids: list, fsx_sg: ec2.SecurityGroup, directory_id: str, fsx_profile: str = 'minimal', fsx_overrides: dict = None, fsx_autotune: dict = None, file_systems: int = 1, **kwargs) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        # setup for pseudo parameters
+        stack = core.Stack.of(self)
+
+        ## FSx
+        # Create FSx - Storage type, size, throughput and deployment type come from the FSx profile, see fsx_profiles.py
+        # A pool of identical file systems spreads sites over several file servers, sites are placed by fsx_placement.py
+        if file_systems < 1:
+            raise Exception("The cluster needs at least one FSx file system")
+        fsx_settings = get_fsx_profile(fsx_profile, fsx_overrides)
+        multi_az = fsx_settings['deployment_type'] == 'MULTI_AZ_1'
+        file_system_ids = []
+        for index in range(file_systems):
+            windows_fsx = fsx.CfnFileSystem(self, 'WindowsFSx' if index == 0 else 'WindowsFSx' + str(index + 1), file_system_type='WINDOWS',subnet_ids=private_subnet_ids if multi_az else private_subnet_ids[:1],
+                windows_configuration=fsx.CfnFileSystem.WindowsConfigurationProperty(
+                    active_directory_id=directory_id,
+                    throughput_capacity=fsx_settings['throughput_capacity'],
+                    preferred_subnet_id=private_subnet_ids[0] if multi_az else None,
+                    deployment_type=fsx_settings['deployment_type']
+                ),
+                storage_capacity=fsx_settings['storage_capacity'],
+                storage_type=fsx_settings['storage_type'],
+                security_group_ids=[fsx_sg.security_group_id]
+            )
+            file_system_ids.append(windows_fsx.ref)
+
+        ## FSx Auto-Tuner - Raises throughput or storage capacity when CloudWatch metrics cross thresholds, see lambdas/fsx_autotuner
+        # Capacity changed by the tuner drifts from the template, raise the profile values to match before changing them in CDK
+        if fsx_autotune is not None:
+            file_system_arns = [stack.format_arn(service='fsx', resource='file-system', resource_name=file_system_id) for file_system_id in file_system_ids]
+            autotuner_function = lambda_.Function(self, 'FSxAutoTunerFunction',
+                runtime=lambda_.Runtime('python3.12', lambda_.RuntimeFamily.PYTHON), # Newer than the runtimes this CDK version knows about
+                handler='index.handler',
+                code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), 'lambdas', 'fsx_autotuner')),
+                timeout=core.Duration.minutes(1),
+                environment={
+                    'FILE_SYSTEM_IDS': core.Fn.join(',', file_system_ids),
+                    'THRESHOLDS': json.dumps(fsx_autotune.get('thresholds', {}))
+                },
+                initial_policy=[
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=[
+                            'fsx:DescribeFileSystems',
+                            'fsx:UpdateFileSystem'
+                        ],
+                        resources=file_system_arns
+                    ),
+                    iam.PolicyStatement(
+                        effect=iam.Effect.ALLOW,
+                        actions=[
+                            'cloudwatch:GetMetricData'
+                        ],
+                        resources=['*']
+                    )
+                ]
+            )
+            events.Rule(self, 'FSxAutoTunerSchedule',
+                schedule=events.Schedule.rate(core.Duration.minutes(fsx_autotune.get('interval_minutes', 15))),
+                targets=[events_targets.LambdaFunction(autotuner_function)]
+            )
+
+        # Export Values to be consumed by other stacks
+        self.file_system_ids = file_system_ids
+        self.file_system_id = file_system_ids[0]
+        # Every file system prefers the first private subnet, single AZ ones live there
+        self.file_system_availability_zone = vpc.private_subnets[0].availability_zone
@@ -8,14 +8,22 @@ from aws_cdk import (
     aws_ecr as ecr,
     aws_logs as logs,
     aws_route53 as r53,
+    aws_route53_targets as r53_targets,
+    aws_secretsmanager as secretsmanager,
     custom_resources,
     core
 )
 from fsx_task import custom_fsx_task
+from alb_tuning import get_target_group_settings
+from task_placement import get_placement
+from observability import SiteObservability
+from scaling_schedules import scheduled_actions
+from iis_tuning import get_iis_tuning
+from cdk_ecs_windows_fsx_cdn import ORIGIN_VERIFY_HEADER, origin_sub_domain
 
 class CdkEcsWindowsFSXWebsite(core.Stack):
 
-    def __init__(self, scope: core.Construct, id: str, cluster: ecs.Cluster, hosted_zone_id: str, zone_name: str, sub_domain: str, host_port: int, file_system_id: str, mad_secret_arn: str, mad_domain_name: str, **kwargs) -> None:
+    def __init__(self, scope: core.Construct, id: str, cluster: ecs.Cluster, load_balancer: elbv2.ApplicationLoadBalancer, listener: elbv2.ApplicationListener, priority: int, hosted_zone_id: str, zone_name: str, sub_domain: str, file_system_id: str, mad_secret_arn: str, mad_domain_name: str, image: str = 'microsoft/iis', image_repository_arn: str = None, host_port: int = 0, cpu: int = 512, memory: int = 1024, root_directory: str = 'share', site_directory: str = None, content_sync_mode: str = 'watch', content_sync_interval: int = 30, desired_count: int = 2, min_capacity: int = None, max_capacity: int = None, requests_per_target: int = None, cpu_target_percent: int = None, memory_target_percent: int = None, capacity_provider_name: str = None, cdn: dict = None, target_group_preset: str = 'balanced', target_group_settings: dict = None, placement_strategy: str = 'spread-binpack', fsx_availability_zone: str = None, observability: dict = None, auto_scaling_group_name: str = None, scaling_schedule: list = None, schedule_timezone: str = 'UTC', iis_preset: str = 'stock', iis_settings: dict = None, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
         # check context values
@@ -44,8 +52,8 @@ class CdkEcsWindowsFSXWebsite(core.Stack):
         execution_role = iam.Role(self, "ExecutionRole",
             role_name=family + '_execution',
             assumed_by=iam.ServicePrincipal('ecs-tasks.amazonaws.com'),
-            inline_policies=[
-                iam.PolicyDocument(
+            inline_policies={
+                'ExecutionPolicy': iam.PolicyDocument(
                     statements=[
                         iam.PolicyStatement(
                             effect=iam.Effect.ALLOW,
@@ -68,17 +76,44 @@ class CdkEcsWindowsFSXWebsite(core.Stack):
                         )
                     ]
                 )
-            ],
+            },
             managed_policies=[
                 iam.ManagedPolicy.from_managed_policy_arn(self,"AmazonECSTaskExecutionRolePolicy",'arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy')
             ]
         )
 
+        # Allow the first pull of a mirrored image to create its repository and import it from the upstream registry
+        if image_repository_arn is not None:
+            execution_role.add_to_policy(iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "ecr:CreateRepository",
+                    "ecr:BatchImportUpstreamImage"
+                ],
+                resources=[
+                    image_repository_arn
+                ]
+            ))
+
+        # Logs, dashboard and latency alarms, see observability.py - An observability value of False turns them off
+        site_observability = None
+        if observability is not False:
+            site_observability = SiteObservability(self, "Observability", observability)
+
         # Custom Task Definition
         task_definition_arn = custom_fsx_task(self, 
+            image=image,
             host_port=host_port,
+            cpu=cpu,
+            memory=memory,
             family=family, 
             file_system_id=file_system_id, 
+            root_directory=root_directory,
+            site_directory=site_directory if site_directory is not None else sub_domain,
+            content_sync_mode=content_sync_mode,
+            content_sync_interval=content_sync_interval,
+            log_configuration=site_observability.log_configuration if site_observability is not None else None,
+            iis_tuning=get_iis_tuning(iis_preset, iis_settings),
             mad_secret_arn=mad_secret_arn,
             mad_domain_name=mad_domain_name,
             task_role=task_role, 
@@ -99,13 +134,15 @@ class CdkEcsWindowsFSXWebsite(core.Stack):
         cfn_task_definition.add_property_deletion_override('NetworkMode')
 
         container = task_definition.add_container("IISContainer",
-            image=ecs.ContainerImage.from_registry('microsoft/iis'),
-            memory_limit_mib=1028,
-            cpu=512,
+            image=ecs.ContainerImage.from_registry(image),
+            memory_limit_mib=memory,
+            cpu=cpu,
             entry_point=["powershell", "-Command"],
             command=["C:\\ServiceMonitor.exe w3svc"],
         )
 
+        # A host_port of 0 uses dynamic host port mapping, the ALB target group registers each task on its ephemeral port
+        # so several tasks of the same site can share a container instance
         container.add_port_mappings(ecs.PortMapping(
             protocol=ecs.Protocol.TCP,
             container_port=80,
@@ -113,18 +150,152 @@ class CdkEcsWindowsFSXWebsite(core.Stack):
         ))
         # Task Definition - Work Around Part 1 End
 
-        # ECS Service, ALB, Cert
-        ApplicationLoadBalancedEc2Service = ecs_patterns.ApplicationLoadBalancedEc2Service(self, "iis-service",
-            cluster=cluster,
+        # Reference the cluster without its security groups, the ALB stack owns the ALB to host ingress rule
+        site_cluster = ecs.Cluster.from_cluster_attributes(self, "Cluster",
+            cluster_name=cluster.cluster_name,
+            vpc=cluster.vpc,
+            security_groups=[],
+            has_ec2_capacity=True
+        )
+
+        # ECS Service - Placement from task_placement.py, fsx_availability_zone keeps tasks in the AZ of their file system
+        service = ecs.Ec2Service(self, "Service",
+            cluster=site_cluster,
             task_definition=task_definition,
-            desired_count=2,
-            domain_name=domain_name,
-            domain_zone=domain_zone,
-            protocol=elbv2.ApplicationProtocol.HTTPS,
-            redirect_http=True
+            desired_count=desired_count,
+            health_check_grace_period=core.Duration.seconds(60),
+            **get_placement(placement_strategy, fsx_availability_zone)
+        )
+
+        # Target Group and host-header rule on the shared ALB listener (the wildcard cert on the listener covers the site)
+        # Deregistration delay, slow start, routing algorithm and health check come from the target group preset, see alb_tuning.py
+        tuning = get_target_group_settings(target_group_preset, target_group_settings)
+        target_group = elbv2.ApplicationTargetGroup(self, "TargetGroup",
+            vpc=cluster.vpc,
+            port=80,
+            protocol=elbv2.ApplicationProtocol.HTTP,
+            targets=[service],
+            deregistration_delay=core.Duration.seconds(tuning['deregistration_delay']),
+            slow_start=core.Duration.seconds(tuning['slow_start']) if tuning['slow_start'] else None,
+            health_check=elbv2.HealthCheck(
+                path=tuning['health_check_path'],
+                interval=core.Duration.seconds(tuning['health_check_interval']),
+                timeout=core.Duration.seconds(tuning['health_check_timeout']),
+                healthy_threshold_count=tuning['healthy_threshold'],
+                unhealthy_threshold_count=tuning['unhealthy_threshold']
+            )
+        )
+        target_group.set_attribute('load_balancing.algorithm.type', tuning['algorithm'])
+
+        if cdn is None:
+            elbv2.ApplicationListenerRule(self, "ListenerRule",
+                listener=listener,
+                priority=priority,
+                conditions=[elbv2.ListenerCondition.host_headers([domain_name])],
+                target_groups=[target_group]
+            )
+
+            # DNS - Point the site sub domain at the shared ALB
+            r53.ARecord(self, "AliasRecord",
+                zone=domain_zone,
+                record_name=sub_domain,
+                target=r53.RecordTarget.from_alias(r53_targets.LoadBalancerTarget(load_balancer))
+            )
+        else:
+            # CloudFront in front of the ALB, see cdk_ecs_windows_fsx_cdn.py - The site sub domain points at the distribution
+            # and the ALB only serves the origin sub domain to requests carrying the origin secret
+            # The secret is replicated to us-east-1 under the same name so the CDN stack can resolve it
+            self.origin_secret_name = stack.stack_name + '-origin-verify'
+            origin_secret = secretsmanager.Secret(self, "OriginSecret",
+                secret_name=self.origin_secret_name,
+                generate_secret_string=secretsmanager.SecretStringGenerator(
+                    exclude_punctuation=True,
+                    password_length=32
+                )
+            )
+            origin_secret.node.default_child.add_property_override('ReplicaRegions', [
+                {
+                    'Region': 'us-east-1'
+                }
+            ])
+
+            elbv2.ApplicationListenerRule(self, "ListenerRule",
+                listener=listener,
+                priority=priority,
+                conditions=[
+                    elbv2.ListenerCondition.host_headers([origin_sub_domain(sub_domain) + "." + zone_name]),
+                    elbv2.ListenerCondition.http_header(ORIGIN_VERIFY_HEADER, [origin_secret.secret_value.to_string()])
+                ],
+                target_groups=[target_group]
+            )
+
+            r53.ARecord(self, "OriginAliasRecord",
+                zone=domain_zone,
+                record_name=origin_sub_domain(sub_domain),
+                target=r53.RecordTarget.from_alias(r53_targets.LoadBalancerTarget(load_balancer))
+            )
+
+        core.CfnOutput(self, "ServiceURL",
+            value="https://" + domain_name
         )
 
         # Task Definition - Work Around Part 2 (Override the temp task we created earlier that won't actually be used)
-        cfn_service = ApplicationLoadBalancedEc2Service.node.find_child('Service').node.find_child('Service')
+        cfn_service = service.node.find_child('Service')
         cfn_service.add_property_override('TaskDefinition', task_definition_arn)
         # Task Definition - Work Around Part 2 End
+
+        # Place tasks through the cluster capacity provider so pending tasks drive the ASG managed scaling
+        if capacity_provider_name is not None:
+            cfn_service.add_property_deletion_override('LaunchType')
+            cfn_service.add_property_override('CapacityProviderStrategy', [
+                {
+                    'CapacityProvider': capacity_provider_name,
+                    'Weight': 1
+                }
+            ])
+
+        # Service Auto Scaling - Target tracking on ALB requests, CPU and memory
+        if max_capacity is not None:
+            scalable_min_capacity = min_capacity if min_capacity is not None else desired_count
+            scalable_task_count = service.auto_scale_task_count(
+                min_capacity=scalable_min_capacity,
+                max_capacity=max_capacity
+            )
+            if requests_per_target is not None:
+                scalable_task_count.scale_on_request_count('RequestCountScaling',
+                    requests_per_target=requests_per_target,
+                    target_group=target_group
+                )
+            if cpu_target_percent is not None:
+                scalable_task_count.scale_on_cpu_utilization('CpuScaling',
+                    target_utilization_percent=cpu_target_percent
+                )
+            if memory_target_percent is not None:
+                scalable_task_count.scale_on_memory_utilization('MemoryScaling',
+                    target_utilization_percent=memory_target_percent
+                )
+
+            # Scheduled Scaling - Windows come validated from scaling_schedules.get_schedule, each one starts and ends with a scheduled action
+            # Written directly on the scalable target as this CDK version can't set the time zone of scheduled actions
+            if scaling_schedule:
+                cfn_scalable_target = scalable_task_count.node.find_child('Target').node.default_child
+                cfn_scalable_target.add_property_override('ScheduledActions', [
+                    {
+                        'ScheduledActionName': name,
+                        'Schedule': 'cron(' + cron['minute'] + ' ' + cron['hour'] + ' ? * ' + cron['week_day'] + ' *)',
+                        'ScalableTargetAction': {
+                            'MinCapacity': window_min,
+                            'MaxCapacity': window_max
+                        },
+                        'Timezone': schedule_timezone
+                    }
+                    for name, cron, window_min, window_max, _ in scheduled_actions(scaling_schedule, scalable_min_capacity, max_capacity)
+                ])
+
+        if site_observability is not None:
+            site_observability.monitor(
+                service=service,
+                target_group=target_group,
+                file_system_id=file_system_id,
+                auto_scaling_group_name=auto_scaling_group_name
+            )
@@ -0,0 +1,40 @@
+"""Deterministic placement of sites onto the cluster's pool of FSx file systems.
+
+Consistent hashing by site name: every file system owns VIRTUAL_NODES points on a hash ring and a
+site goes to the owner of the first point at or after its own hash. Adding a file system only moves
+the sites whose hash lands on one of the new file system's points, roughly 1/N of them.
+"""
+import hashlib
+from bisect import bisect_left
+
+VIRTUAL_NODES = 160
+
+
+def ring_hash(key: str) -> int:
+    # Stable across Python processes, unlike hash()
+    return int(hashlib.sha256(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def hash_ring(file_systems: int, virtual_nodes: int = VIRTUAL_NODES) -> list:
+    # Sorted (point, file system index) pairs, file systems are numbered in creation order
+    return sorted((ring_hash("fsx-" + str(index) + "-" + str(node)), index) for index in range(file_systems) for node in range(virtual_nodes))
+
+
+def place_site(name: str, ring: list) -> int:
+    position = bisect_left(ring, (ring_hash(name), -1))
+    return ring[position % len(ring)][1]
+
+
+def place_sites(sites: list, file_systems: int) -> dict:
+    # Site name -> file system index, a site's file_system setting pins it and skips the ring
+    if file_systems < 1:
+        raise Exception("The cluster needs at least one FSx file system")
+    ring = hash_ring(file_systems)
+
+    placement = {}
+    for site in sites:
+        pinned = site.get('file_system')
+        if pinned is not None and not 0 <= pinned < file_systems:
+            raise Exception("Site " + site['name'] + " is pinned to FSx file system " + str(pinned) + " but the cluster only has " + str(file_systems))
+        placement[site['name']] = pinned if pinned is not None else place_site(site['name'], ring)
+    return placement
@@ -0,0 +1,54 @@
+# Selectable FSx for Windows File Server profiles
+# https://docs.aws.amazon.com/fsx/latest/WindowsGuide/performance.html
+FSX_PROFILES = {
+    # Original sample sizing, the service minimums
+    'minimal': {
+        'storage_type': 'SSD',
+        'storage_capacity': 32, # GB
+        'throughput_capacity': 8, # MB/s
+        'deployment_type': 'MULTI_AZ_1'
+    },
+    'standard': {
+        'storage_type': 'SSD',
+        'storage_capacity': 64,
+        'throughput_capacity': 32,
+        'deployment_type': 'MULTI_AZ_1'
+    },
+    'performance': {
+        'storage_type': 'SSD',
+        'storage_capacity': 256,
+        'throughput_capacity': 128,
+        'deployment_type': 'MULTI_AZ_1'
+    },
+    # Large, mostly cold content, HDD storage has a 2000 GB minimum
+    'hdd': {
+        'storage_type': 'HDD',
+        'storage_capacity': 2000,
+        'throughput_capacity': 32,
+        'deployment_type': 'MULTI_AZ_1'
+    },
+    # Single AZ file server, cheaper but the share is unavailable during an AZ outage
+    'single-az': {
+        'storage_type': 'SSD',
+        'storage_capacity': 64,
+        'throughput_capacity': 32,
+        'deployment_type': 'SINGLE_AZ_2'
+    },
+}
+
+THROUGHPUT_CAPACITIES = [8, 16, 32, 64, 128, 256, 512, 1024, 2048] # MB/s
+MIN_STORAGE_CAPACITY = {'SSD': 32, 'HDD': 2000} # GB
+
+def get_fsx_profile(name: str, overrides: dict = None) -> dict:
+    if name not in FSX_PROFILES:
+        raise Exception("Unknown FSx profile " + name + ", choose one of " + ", ".join(FSX_PROFILES))
+    profile = dict(FSX_PROFILES[name])
+    profile.update(overrides or {})
+
+    if profile['throughput_capacity'] not in THROUGHPUT_CAPACITIES:
+        raise Exception("FSx throughput_capacity must be one of " + ", ".join(str(t) for t in THROUGHPUT_CAPACITIES))
+    if profile['storage_capacity'] < MIN_STORAGE_CAPACITY[profile['storage_type']]:
+        raise Exception("FSx " + profile['storage_type'] + " storage_capacity must be at least " + str(MIN_STORAGE_CAPACITY[profile['storage_type']]) + " GB")
+    if profile['storage_type'] == 'HDD' and profile['deployment_type'] == 'SINGLE_AZ_1':
+        raise Exception("FSx HDD storage requires the MULTI_AZ_1 or SINGLE_AZ_2 deployment type")
+    return profile
@@ -1,102 +1,151 @@
+import base64
+import os
+import re
 from aws_cdk import (
     aws_iam as iam,
-    custom_resources,
+    aws_lambda as lambda_,
+    core
 )
+from iis_tuning import IisTuning, render_iis_preamble
 
-def custom_fsx_task(self, host_port: int, family: str, file_system_id: str, mad_secret_arn: str, mad_domain_name: str, task_role: iam.Role, execution_role: iam.Role): 
-    on_create_aws_sdk_call=custom_resources.AwsSdkCall(
-        physical_resource_id=custom_resources.PhysicalResourceId.from_response('taskDefinition.taskDefinitionArn'),
-        service="ECS",
-        action="registerTaskDefinition", # https://docs.aws.amazon.com/AWSJavaScriptSDK/latest/AWS/ECS.html (watch out for camel case!)
-        parameters={
-            "family": family,
-            "taskRoleArn": task_role.role_arn,
-            "executionRoleArn": execution_role.role_arn,
-            "containerDefinitions": [
-                {
-                    "name": "IISContainer",
-                    "image": "microsoft/iis",
-                    "cpu": 512,
-                    "memory": 1024,
-                    "links": [],
-                    "portMappings": [
-                        {
-                            "containerPort": 80,
-                            "hostPort": host_port,
-                            "protocol": "tcp"
-                        }
-                    ],
-                    "essential": True,
-                    "entryPoint": [
-                        "powershell",
-                        "-Command"
-                    ],
-                    "mountPoints": [
-                        {
-                            "sourceVolume": file_system_id,
-                            "containerPath": 'C:\\fsx-windows-dir',
-                            "readOnly": False
-                        },
-                    ],
-                    "command": [
-                        '$IndexFilePath = "C:\\fsx-windows-dir\\index.html"; if ((Test-Path -Path $IndexFilePath) -ne $true){New-Item -Path $IndexFilePath -ItemType file -Value "<html> <head> <title>Amazon ECS Sample App</title> <style>body {margin-top: 40px; background-color: #ff3;} </style> </head><body> <div style=color:black;text-align:center> <h1>Amazon ECS Sample App</h1> <h2>Congratulations!</h2> <p>Your application is now running on a container in Amazon ECS.</p> <table style=margin-left:auto;margin-right:auto;><tr><th>TimeStamp</th><th>Task ID</th></tr>" -Force;}; $datetime = Get-Date -Format "yyyy-MM-dd HH:mm:ss"; $TaskId = (Invoke-RestMethod -Method GET -Uri $env:ECS_CONTAINER_METADATA_URI_V4/task).TaskARN.split("/")[2]; Add-Content -Path $IndexFilePath -Value "<tr><th>$datetime</th><th>$TaskId</th></tr>"; Copy-Item -Path $IndexFilePath -Destination C:\\inetpub\\wwwroot\\index.html -Force; C:\\ServiceMonitor.exe w3svc;'
-                    ]
-                }
-            ],
-            "volumes": [
-                {
-                    'name': file_system_id,
-                    'fsxWindowsFileServerVolumeConfiguration': {
-                        'fileSystemId': file_system_id,
-                        'rootDirectory': 'share',
-                        'authorizationConfig': {
-                            'credentialsParameter': mad_secret_arn,
-                            'domain': mad_domain_name
-                        }
-                    }
-                },
-            ],
-            "requiresCompatibilities": [
-                'EC2'
-            ]
-        }
+def content_sync_script():
+    # The sync script without its help block and comment lines, it travels inside the container command
+    with open(os.path.join(os.path.dirname(__file__), 'scripts', 'content_sync.ps1')) as fp:
+        script = re.sub(r'<#.*?#>', '', fp.read(), flags=re.S)
+    return '\n'.join(line for line in script.splitlines() if line.strip() and not line.strip().startswith('#'))
+
+# Windows command line limit, the entry point, its arguments and the encoded command all count
+COMMAND_LINE_LIMIT = 32767
+ENTRY_POINT = ['powershell', '-NoProfile', '-EncodedCommand']
+
+def container_command(site_directory: str, content_sync_mode: str = 'watch', content_sync_interval: int = 30, iis_tuning: IisTuning = None) -> str:
+    if content_sync_mode not in ('interval', 'watch'):
+        raise Exception("content_sync_mode must be interval or watch")
+
+    # ECS can't mount a directory that doesn't exist yet, so the task creates the site directory below the mounted root_directory itself
+    site_path = 'C:\\fsx-windows-dir\\' + site_directory
+
+    # The site's wwwroot on the share is synced to the local IIS wwwroot, see scripts/content_sync.ps1
+    # Sample content is only written when the site has none yet, each task reports to its own record in the status directory
+    # IIS is tuned first, the sync script only starts ServiceMonitor and with it IIS after the first sync, see iis_tuning.py
+    return (
+        (render_iis_preamble(iis_tuning) if iis_tuning is not None else '') +
+        '$SiteDirectory = "' + site_path + '"; $ContentDirectory = "$SiteDirectory\\wwwroot"; '
+        'New-Item -Path $ContentDirectory -ItemType Directory -Force | Out-Null; '
+        'if (-not (Get-ChildItem -Path $ContentDirectory -Force)) {New-Item -Path "$ContentDirectory\\index.html" -ItemType file -Value "<html> <head> <title>Amazon ECS Sample App</title> <style>body {margin-top: 40px; background-color: #ff3;} </style> </head><body> <div style=color:black;text-align:center> <h1>Amazon ECS Sample App</h1> <h2>Congratulations!</h2> <p>Your application is now running on a container in Amazon ECS.</p> </div></body></html>" -Force | Out-Null;}; '
+        '$TaskId = (Invoke-RestMethod -Method GET -Uri $env:ECS_CONTAINER_METADATA_URI_V4/task).TaskARN.split("/")[-1]; '
+        '& {' + content_sync_script() + '} -Source $ContentDirectory -Destination C:\\inetpub\\wwwroot -StatusDirectory "$SiteDirectory\\status" -TaskId $TaskId '
+        '-Mode ' + content_sync_mode + ' -IntervalSeconds ' + str(content_sync_interval) + ' -ServiceMonitor C:\\ServiceMonitor.exe'
     )
 
-    on_delete_aws_sdk_call=custom_resources.AwsSdkCall(
-        physical_resource_id=custom_resources.PhysicalResourceId.from_response('taskDefinition.taskDefinitionArn'),
-        service="ECS",
-        action="deregisterTaskDefinition", # https://docs.aws.amazon.com/AWSJavaScriptSDK/latest/AWS/ECS.html (watch out for camel case!)
-        parameters={
-            "taskDefinition": custom_resources.PhysicalResourceIdReference() # https://docs.aws.amazon.com/cdk/api/latest/docs/custom-resources-readme.html#physical-resource-id-parameter 
-        }
+def encode_command(command: str) -> str:
+    # -EncodedCommand takes base64 UTF-16LE, which also sidesteps quoting the script through ECS and Docker
+    encoded = base64.b64encode(command.encode('utf-16-le')).decode('ascii')
+    if len(' '.join(ENTRY_POINT + [encoded])) > COMMAND_LINE_LIMIT:
+        raise Exception("The container command is over the " + str(COMMAND_LINE_LIMIT) + " character command line limit once encoded, shorten the IIS tuning or the sync script")
+    return encoded
+
+def custom_fsx_task(self, host_port: int, family: str, file_system_id: str, mad_secret_arn: str, mad_domain_name: str, task_role: iam.Role, execution_role: iam.Role, cpu: int = 512, memory: int = 1024, root_directory: str = 'share', site_directory: str = 'site', content_sync_mode: str = 'watch', content_sync_interval: int = 30, log_configuration: dict = None, retain_revisions: int = 5, image: str = 'microsoft/iis', iis_tuning: IisTuning = None): 
+    command = container_command(site_directory, content_sync_mode, content_sync_interval, iis_tuning)
+
+    # The volume mounts root_directory of the site's file system, the site keeps its content in its own site_directory below it
+    volume_name = 'fsx-windows'
+
+    # registerTaskDefinition parameters https://docs.aws.amazon.com/AmazonECS/latest/APIReference/API_RegisterTaskDefinition.html
+    parameters = {
+        "family": family,
+        "taskRoleArn": task_role.role_arn,
+        "executionRoleArn": execution_role.role_arn,
+        "containerDefinitions": [
+            {
+                "name": "IISContainer",
+                "image": image,
+                "cpu": cpu,
+                "memory": memory,
+                "links": [],
+                "portMappings": [
+                    {
+                        "containerPort": 80,
+                        "hostPort": host_port, # 0 = dynamic host port from the Windows ephemeral range (49152-65535)
+                        "protocol": "tcp"
+                    }
+                ],
+                "essential": True,
+                "entryPoint": ENTRY_POINT,
+                "mountPoints": [
+                    {
+                        "sourceVolume": volume_name,
+                        "containerPath": 'C:\\fsx-windows-dir',
+                        "readOnly": False
+                    },
+                ],
+                "command": [
+                    encode_command(command)
+                ]
+            }
+        ],
+        "volumes": [
+            {
+                'name': volume_name,
+                'fsxWindowsFileServerVolumeConfiguration': {
+                    'fileSystemId': file_system_id,
+                    'rootDirectory': root_directory,
+                    'authorizationConfig': {
+                        'credentialsParameter': mad_secret_arn,
+                        'domain': mad_domain_name
+                    }
+                }
+            },
+        ],
+        "requiresCompatibilities": [
+            'EC2'
+        ]
+    }
+
+    if log_configuration is not None:
+        parameters['containerDefinitions'][0]['logConfiguration'] = log_configuration
+
+    # Lambda backed Custom Resource - Registers a new revision only when the parameters hash changes, see lambdas/task_definition
+    task_definition_function = lambda_.Function(self, "FSXTaskFunction",
+        runtime=lambda_.Runtime('python3.12', lambda_.RuntimeFamily.PYTHON), # Newer than the runtimes this CDK version knows about
+        handler="index.handler",
+        code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), 'lambdas', 'task_definition')),
+        timeout=core.Duration.minutes(5),
+        initial_policy=[
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "ecs:RegisterTaskDefinition",
+                    "ecs:DeregisterTaskDefinition",
+                    "ecs:DeleteTaskDefinitions",
+                    "ecs:DescribeTaskDefinition",
+                    "ecs:ListTaskDefinitions",
+                    "ecs:TagResource"
+                ],
+                resources=["*"] # Task definition actions don't support resource level permissions
+            ),
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    "iam:PassRole"
+                ],
+                resources=[
+                    task_role.role_arn,
+                    execution_role.role_arn
+                ]
+            )
+        ]
     )
 
-    custom_task = custom_resources.AwsCustomResource(self, "FSXTaskResource",
-        policy=custom_resources.AwsCustomResourcePolicy.from_statements(
-            statements=[
-                iam.PolicyStatement(
-                    effect=iam.Effect.ALLOW,
-                    actions=[
-                        "ecs:*"
-                    ],
-                    resources=["*"]
-                ),
-                iam.PolicyStatement(
-                    effect=iam.Effect.ALLOW,
-                    actions=[
-                        "iam:PassRole"
-                    ],
-                    resources=[
-                        task_role.role_arn,
-                        execution_role.role_arn
-                    ]
-                )
-            ]
-        ),
-        on_create=on_create_aws_sdk_call,
-        on_update=on_create_aws_sdk_call,
-        on_delete=on_delete_aws_sdk_call
+    custom_task = core.CustomResource(self, "FSXTaskResource",
+        service_token=task_definition_function.function_arn,
+        resource_type="Custom::FSXTaskDefinition",
+        properties={
+            # Passed as a JSON string as CloudFormation turns numbers and booleans in custom resource properties into strings
+            "TaskDefinition": core.Stack.of(self).to_json_string(parameters),
+            "RetainRevisions": str(retain_revisions)
+        }
     )
 
-    task_definition_arn = custom_task.get_response_field('taskDefinition.taskDefinitionArn')
-    return task_definition_arn
\ No newline at end of file
+    task_definition_arn = custom_task.get_att_string('TaskDefinitionArn')
+    return task_definition_arn
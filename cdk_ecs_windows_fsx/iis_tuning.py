@@ -0,0 +1,112 @@
+from typing import NamedTuple
+
+APPCMD = 'C:\\Windows\\System32\\inetsrv\\appcmd.exe'
+
+# Static file extensions cached in kernel mode (http.sys) until the file changes
+STATIC_EXTENSIONS = ['.html', '.htm', '.css', '.js', '.json', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.ico', '.woff', '.woff2']
+
+
+class IisTuning(NamedTuple):
+    # IIS settings applied inside the container before IIS starts, the defaults are the stock IIS values
+    static_compression: bool = False
+    # Needs the Dynamic Content Compression feature, installed on every task start which adds to the start time
+    dynamic_compression: bool = False
+    # Kernel mode output caching of STATIC_EXTENSIONS and serving cached responses from the first hit
+    kernel_cache: bool = False
+    # Cache-Control max-age in seconds sent with static files, 0 sends none
+    static_max_age: int = 0
+    # Requests http.sys queues for the app pool before answering 503
+    queue_length: int = 1000
+    # Minutes without requests before the worker process shuts down, 0 never
+    idle_timeout: int = 20
+    # Minutes between scheduled worker process recycles, 0 never
+    periodic_restart: int = 1740
+    app_pool: str = 'DefaultAppPool'
+
+
+# Named IIS tunings for site tasks
+IIS_PRESETS = {
+    # Stock IIS, nothing is changed. The default, the other presets send a day long max-age with every static file,
+    # .html included, so browsers and the CDN keep serving edited pages until it runs out
+    'stock': IisTuning(),
+    # Compress and kernel cache static files, long queue, no idle shutdown or scheduled recycling as ECS replaces tasks instead
+    'balanced': IisTuning(
+        static_compression=True,
+        kernel_cache=True,
+        static_max_age=86400,
+        queue_length=5000,
+        idle_timeout=0,
+        periodic_restart=0
+    ),
+    # balanced plus compression of dynamic responses, more CPU per request and a slower task start
+    'compress-all': IisTuning(
+        static_compression=True,
+        dynamic_compression=True,
+        kernel_cache=True,
+        static_max_age=86400,
+        queue_length=5000,
+        idle_timeout=0,
+        periodic_restart=0
+    ),
+}
+
+
+def get_iis_tuning(preset: str = 'stock', overrides: dict = None) -> IisTuning:
+    if preset not in IIS_PRESETS:
+        raise Exception("Unknown IIS preset " + preset + ", choose one of " + ", ".join(IIS_PRESETS))
+    overrides = overrides or {}
+    unknown = [key for key in overrides if key not in IisTuning._fields]
+    if unknown:
+        raise Exception("Unknown IIS settings " + ", ".join(unknown) + ", valid settings are " + ", ".join(IisTuning._fields))
+
+    tuning = IIS_PRESETS[preset]._replace(**overrides)
+    if not 10 <= tuning.queue_length <= 65535:
+        raise Exception("IIS queue_length must be between 10 and 65535")
+    for name in ('static_max_age', 'idle_timeout', 'periodic_restart'):
+        if getattr(tuning, name) < 0:
+            raise Exception("IIS " + name + " can't be negative")
+    return tuning
+
+
+def timespan(seconds: int) -> str:
+    # IIS configuration time spans are d.hh:mm:ss
+    days, seconds = divmod(seconds, 86400)
+    return '%d.%02d:%02d:%02d' % (days, seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def render_iis_preamble(tuning: IisTuning) -> str:
+    # PowerShell statements for the container command, run before ServiceMonitor starts IIS
+    # Every appcmd argument is a single quoted PowerShell string so brackets and commas reach appcmd unchanged
+    def appcmd(*arguments):
+        return '& ' + APPCMD + ' ' + ' '.join("'" + argument.replace("'", "''") + "'" for argument in arguments) + ' | Out-Null'
+
+    statements = []
+    if tuning.dynamic_compression:
+        statements.append('if (-not (Get-WindowsFeature Web-Dyn-Compression).Installed) {Install-WindowsFeature Web-Dyn-Compression | Out-Null}')
+    if tuning.static_compression or tuning.dynamic_compression:
+        statements.append(appcmd('set', 'config', '-section:system.webServer/urlCompression',
+            '/doStaticCompression:' + str(tuning.static_compression).lower(),
+            '/doDynamicCompression:' + str(tuning.dynamic_compression).lower()
+        ))
+    if tuning.kernel_cache:
+        # IIS only caches and compresses a file once it is hit twice within 10 seconds by default
+        statements.append(appcmd('set', 'config', '-section:system.webServer/serverRuntime', '/frequentHitThreshold:1'))
+        statements.append(appcmd('set', 'config', '-section:system.webServer/caching', '/enabled:true', '/enableKernelCache:true'))
+        # One loop rather than a statement per extension, the encoded command has to stay below the 32767 character command line limit
+        statements.append('foreach ($Extension in ' + ','.join("'" + extension + "'" for extension in STATIC_EXTENSIONS) + ') {' +
+            '& ' + APPCMD + " 'set' 'config' '-section:system.webServer/caching' " +
+            '"/+profiles.[extension=\'$Extension\',policy=\'CacheUntilChange\',kernelCachePolicy=\'CacheUntilChange\']" | Out-Null}'
+        )
+    if tuning.static_max_age:
+        statements.append(appcmd('set', 'config', '-section:system.webServer/staticContent',
+            '/clientCache.cacheControlMode:UseMaxAge',
+            '/clientCache.cacheControlMaxAge:' + timespan(tuning.static_max_age)
+        ))
+    stock = IisTuning()
+    if (tuning.queue_length, tuning.idle_timeout, tuning.periodic_restart) != (stock.queue_length, stock.idle_timeout, stock.periodic_restart):
+        statements.append(appcmd('set', 'apppool', tuning.app_pool,
+            '/queueLength:' + str(tuning.queue_length),
+            '/processModel.idleTimeout:' + timespan(tuning.idle_timeout * 60),
+            '/recycling.periodicRestart.time:' + timespan(tuning.periodic_restart * 60)
+        ))
+    return ''.join(statement + '; ' for statement in statements)
@@ -0,0 +1,114 @@
+"""Raises FSx for Windows File Server throughput or storage capacity from CloudWatch metrics.
+
+Runs on a schedule. For each file system it reads the recent DataReadBytes, DataWriteBytes and
+FreeStorageCapacity series and decides, with the pure decide() function, whether to step throughput
+capacity up or grow storage. Capacity is only ever raised, lowering it is left to an operator.
+"""
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+THROUGHPUT_CAPACITIES = [8, 16, 32, 64, 128, 256, 512, 1024, 2048] # MB/s
+MEBIBYTE = 1024 * 1024
+
+DEFAULT_THRESHOLDS = {
+    'period_seconds': 300,
+    'throughput_high': 0.8, # fraction of throughput capacity
+    'sustained_periods': 3, # consecutive periods above throughput_high before stepping up
+    'free_storage_low': 0.2, # fraction of storage capacity
+    'storage_growth': 0.2, # fraction to grow storage by, FSx requires at least 10%
+    'max_throughput_capacity': 512,
+    'max_storage_capacity': 4096 # GB
+}
+
+
+def throughput_utilization(read_bytes, write_bytes, period_seconds, throughput_capacity):
+    # Per period fraction of the provisioned throughput used by client reads and writes
+    return [(r + w) / period_seconds / (throughput_capacity * MEBIBYTE) for r, w in zip(read_bytes, write_bytes)]
+
+
+def next_throughput_capacity(throughput_capacity):
+    larger = [t for t in THROUGHPUT_CAPACITIES if t > throughput_capacity]
+    return larger[0] if larger else None
+
+
+def decide(throughput_capacity, storage_capacity, read_bytes, write_bytes, free_storage_bytes, thresholds=None):
+    """Return the UpdateFileSystem changes to make, an empty dict when nothing needs to change.
+
+    Series are oldest first, one value per period. Storage runs out harder than throughput saturates,
+    so storage growth wins when both are needed (FSx runs one update at a time).
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+
+    if free_storage_bytes:
+        free_fraction = free_storage_bytes[-1] / (storage_capacity * 1024 * MEBIBYTE)
+        if free_fraction < thresholds['free_storage_low']:
+            growth = max(thresholds['storage_growth'], 0.1)
+            # Rounded first, 100 * 1.1 is 110.00000000000001 in floating point and would ceil to 111
+            target = min(int(math.ceil(round(storage_capacity * (1 + growth), 6))), thresholds['max_storage_capacity'])
+            if target >= math.ceil(round(storage_capacity * 1.1, 6)):
+                return {'StorageCapacity': target}
+
+    sustained = thresholds['sustained_periods']
+    utilization = throughput_utilization(read_bytes, write_bytes, thresholds['period_seconds'], throughput_capacity)
+    if len(utilization) >= sustained and all(u >= thresholds['throughput_high'] for u in utilization[-sustained:]):
+        target = next_throughput_capacity(throughput_capacity)
+        if target is not None and target <= thresholds['max_throughput_capacity']:
+            return {'ThroughputCapacity': target}
+
+    return {}
+
+
+def metric_series(cloudwatch, file_system_id, thresholds):
+    period = thresholds['period_seconds']
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(seconds=period * (thresholds['sustained_periods'] + 1))
+    queries = [
+        {
+            'Id': query_id,
+            'MetricStat': {
+                'Metric': {'Namespace': 'AWS/FSx', 'MetricName': metric, 'Dimensions': [{'Name': 'FileSystemId', 'Value': file_system_id}]},
+                'Period': period,
+                'Stat': stat
+            }
+        }
+        for query_id, metric, stat in [('read', 'DataReadBytes', 'Sum'), ('write', 'DataWriteBytes', 'Sum'), ('free', 'FreeStorageCapacity', 'Average')]
+    ]
+    response = cloudwatch.get_metric_data(MetricDataQueries=queries, StartTime=start, EndTime=end, ScanBy='TimestampAscending')
+    series = {result['Id']: result['Values'] for result in response['MetricDataResults']}
+    return series.get('read', []), series.get('write', []), series.get('free', [])
+
+
+def tune(fsx, cloudwatch, file_system_id, thresholds):
+    file_system = fsx.describe_file_systems(FileSystemIds=[file_system_id])['FileSystems'][0]
+    # One update at a time, and storage can't grow again until the previous optimization finished
+    if any(action.get('Status') in ('PENDING', 'IN_PROGRESS', 'UPDATED_OPTIMIZING') for action in file_system.get('AdministrativeActions', [])):
+        return {}
+
+    read_bytes, write_bytes, free_storage_bytes = metric_series(cloudwatch, file_system_id, thresholds)
+    changes = decide(
+        file_system['WindowsConfiguration']['ThroughputCapacity'],
+        file_system['StorageCapacity'],
+        read_bytes, write_bytes, free_storage_bytes,
+        thresholds
+    )
+    if 'StorageCapacity' in changes:
+        fsx.update_file_system(FileSystemId=file_system_id, StorageCapacity=changes['StorageCapacity'])
+    elif 'ThroughputCapacity' in changes:
+        fsx.update_file_system(FileSystemId=file_system_id, WindowsConfiguration={'ThroughputCapacity': changes['ThroughputCapacity']})
+    return changes
+
+
+def handler(event, context):
+    # Imported here so decide() and tune() can be used with any clients, boto3 comes with the Lambda runtime
+    import boto3
+
+    thresholds = dict(DEFAULT_THRESHOLDS, **json.loads(os.environ.get('THRESHOLDS', '{}')))
+    fsx = boto3.client('fsx')
+    cloudwatch = boto3.client('cloudwatch')
+    decisions = {}
+    for file_system_id in os.environ['FILE_SYSTEM_IDS'].split(','):
+        decisions[file_system_id] = tune(fsx, cloudwatch, file_system_id, thresholds)
+    print(json.dumps(decisions))
+    return decisions
@@ -0,0 +1,119 @@
+"""CloudFormation custom resource that registers an ECS task definition only when it changed.
+
+The effective registerTaskDefinition parameters are hashed and the hash is stored as a tag on
+each revision. When the latest ACTIVE revision of the family carries the same hash its ARN is
+returned and nothing is registered, so the service isn't rolled.
+
+prune_revisions() is the only place revisions are retired. On create and update the revisions beyond
+the retention limit are deregistered and deleted in bulk, along with any INACTIVE ones. The Delete
+CloudFormation sends for the previous revision after an update leaves it to that retention, only
+deleting the resource itself retires every revision of the family.
+"""
+import hashlib
+import json
+import urllib.request
+
+HASH_TAG = 'parameters-hash'
+DEFAULT_RETAIN_REVISIONS = 5
+DELETE_BATCH_SIZE = 10 # DeleteTaskDefinitions accepts at most 10 revisions per call
+
+
+def parameters_hash(parameters):
+    canonical = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def find_registered(ecs, family, digest):
+    # Latest ACTIVE revision of the family, if it was registered from the same parameters
+    try:
+        response = ecs.describe_task_definition(taskDefinition=family, include=['TAGS'])
+    except ecs.exceptions.ClientException:
+        return None # Family has no ACTIVE revision yet
+    for tag in response.get('tags', []):
+        if tag['key'] == HASH_TAG and tag['value'] == digest:
+            return response['taskDefinition']['taskDefinitionArn']
+    return None
+
+
+def register(ecs, parameters, digest):
+    response = ecs.register_task_definition(tags=[{'key': HASH_TAG, 'value': digest}], **parameters)
+    return response['taskDefinition']['taskDefinitionArn']
+
+
+def family_of(task_definition_arn):
+    # arn:aws:ecs:<region>:<account>:task-definition/<family>:<revision>
+    return task_definition_arn.split('/')[-1].rsplit(':', 1)[0]
+
+
+def list_revisions(ecs, family, status):
+    # familyPrefix is a prefix match, keep only revisions of exactly this family (newest first)
+    arns = []
+    for page in ecs.get_paginator('list_task_definitions').paginate(familyPrefix=family, status=status, sort='DESC'):
+        arns.extend(arn for arn in page['taskDefinitionArns'] if family_of(arn) == family)
+    return arns
+
+
+def prune_revisions(ecs, family, current_arn, retain):
+    # Keeps current_arn and the newest retain - 1 other ACTIVE revisions, retain 0 with no current_arn retires them all
+    # INACTIVE revisions can't be used again, they are only deleted. Listed first, the revisions deregistered below would show up again
+    inactive = list_revisions(ecs, family, 'INACTIVE')
+    active = [arn for arn in list_revisions(ecs, family, 'ACTIVE') if arn != current_arn][max(retain - 1, 0):]
+    for arn in active:
+        ecs.deregister_task_definition(taskDefinition=arn)
+    stale = active + inactive
+    for i in range(0, len(stale), DELETE_BATCH_SIZE):
+        ecs.delete_task_definitions(taskDefinitions=stale[i:i + DELETE_BATCH_SIZE])
+    return stale
+
+
+def on_event(ecs, event):
+    properties = event['ResourceProperties']
+
+    if event['RequestType'] == 'Delete':
+        physical_resource_id = event['PhysicalResourceId']
+        # A failed create leaves a non ARN physical id behind, there is nothing to retire
+        if not physical_resource_id.startswith('arn:'):
+            return physical_resource_id, {}
+        # After an update a newer revision replaced this one, which the update already left to the retention limit
+        # Otherwise the resource itself is being deleted and the family goes with it
+        family = family_of(physical_resource_id)
+        active = list_revisions(ecs, family, 'ACTIVE')
+        if not active or active[0] == physical_resource_id:
+            prune_revisions(ecs, family, None, 0)
+        return physical_resource_id, {}
+
+    parameters = json.loads(properties['TaskDefinition'])
+    digest = parameters_hash(parameters)
+    task_definition_arn = find_registered(ecs, parameters['family'], digest)
+    if task_definition_arn is None:
+        task_definition_arn = register(ecs, parameters, digest)
+
+    prune_revisions(ecs, parameters['family'], task_definition_arn, int(properties.get('RetainRevisions', DEFAULT_RETAIN_REVISIONS)))
+    return task_definition_arn, {'TaskDefinitionArn': task_definition_arn, 'ParametersHash': digest}
+
+
+def send_response(event, context, status, physical_resource_id, data, reason=None):
+    body = json.dumps({
+        'Status': status,
+        'Reason': reason or 'See CloudWatch Log Stream: ' + context.log_stream_name,
+        'PhysicalResourceId': physical_resource_id,
+        'StackId': event['StackId'],
+        'RequestId': event['RequestId'],
+        'LogicalResourceId': event['LogicalResourceId'],
+        'Data': data
+    }).encode('utf-8')
+    request = urllib.request.Request(event['ResponseURL'], data=body, method='PUT', headers={'Content-Type': ''})
+    urllib.request.urlopen(request)
+
+
+def handler(event, context):
+    # Imported here so the rest of the module can be used with any ECS client, boto3 comes with the Lambda runtime
+    import boto3
+
+    print(json.dumps({k: v for k, v in event.items() if k != 'ResponseURL'}))
+    try:
+        physical_resource_id, data = on_event(boto3.client('ecs'), event)
+        send_response(event, context, 'SUCCESS', physical_resource_id, data)
+    except Exception as e:
+        print(e)
+        send_response(event, context, 'FAILED', event.get('PhysicalResourceId', context.log_stream_name), {}, str(e))
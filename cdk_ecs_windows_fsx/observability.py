@@ -0,0 +1,109 @@
+from aws_cdk import (
+    aws_cloudwatch as cw,
+    aws_cloudwatch_actions as cw_actions,
+    aws_ecs as ecs,
+    aws_elasticloadbalancingv2 as elbv2,
+    aws_logs as logs,
+    aws_sns as sns,
+    core
+)
+
+# Values used for any setting a site's observability object does not declare
+OBSERVABILITY_DEFAULTS = {
+    'log_retention': 'ONE_MONTH', # a logs.RetentionDays name
+    'log_buffer_size': '25m', # non-blocking awslogs buffer, log lines are dropped rather than stalling IIS when it is full
+    'latency_p90_ms': 500,
+    'latency_p99_ms': 1500,
+    'evaluation_periods': 5, # one minute periods
+    'alarm_topic_arn': None
+}
+
+# Container logs, a CloudWatch dashboard and latency SLO alarms for one site
+# Created before the task definition so its log_configuration can be added to the container,
+# monitor() then builds the dashboard and alarms once the service and target group exist
+class SiteObservability(core.Construct):
+
+    def __init__(self, scope: core.Construct, id: str, settings: dict = None) -> None:
+        super().__init__(scope, id)
+
+        self.settings = dict(OBSERVABILITY_DEFAULTS)
+        # A null setting keeps its default, like one that isn't set
+        self.settings.update({key: value for key, value in (settings or {}).items() if value is not None})
+        if self.settings['log_retention'] not in logs.RetentionDays.__members__:
+            raise Exception("Unknown log_retention " + self.settings['log_retention'] + ", choose one of " + ", ".join(logs.RetentionDays.__members__))
+
+        stack = core.Stack.of(self)
+        self.log_group = logs.LogGroup(self, "LogGroup",
+            retention=logs.RetentionDays[self.settings['log_retention']],
+            removal_policy=core.RemovalPolicy.DESTROY
+        )
+
+        # logConfiguration for registerTaskDefinition, the awslogs driver writes with the container instance role
+        self.log_configuration = {
+            'logDriver': 'awslogs',
+            'options': {
+                'awslogs-group': self.log_group.log_group_name,
+                'awslogs-region': stack.region,
+                'awslogs-stream-prefix': 'iis',
+                'mode': 'non-blocking',
+                'max-buffer-size': self.settings['log_buffer_size']
+            }
+        }
+
+    def monitor(self, service: ecs.Ec2Service, target_group: elbv2.ApplicationTargetGroup, file_system_id: str, auto_scaling_group_name: str) -> None:
+        stack = core.Stack.of(self)
+        minute = core.Duration.minutes(1)
+
+        latency = {
+            statistic: target_group.metric_target_response_time(statistic=statistic, period=minute, label="TargetResponseTime " + statistic)
+            for statistic in ['p50', 'p90', 'p99']
+        }
+        requests = target_group.metric_request_count(period=minute, statistic='Sum')
+        target_5xx = target_group.metric_http_code_target(elbv2.HttpCodeTarget.TARGET_5XX_COUNT, period=minute, statistic='Sum')
+
+        fsx_metrics = {
+            metric_id: cw.Metric(namespace='AWS/FSx', metric_name=metric_name, dimensions={'FileSystemId': file_system_id}, period=minute, statistic='Sum')
+            for metric_id, metric_name in [('rb', 'DataReadBytes'), ('wb', 'DataWriteBytes'), ('ro', 'DataReadOperations'), ('wo', 'DataWriteOperations')]
+        }
+        fsx_throughput = cw.MathExpression(expression="(rb + wb) / PERIOD(rb) / 1048576", using_metrics={k: fsx_metrics[k] for k in ['rb', 'wb']}, label="Throughput MB/s", period=minute)
+        fsx_iops = cw.MathExpression(expression="(ro + wo) / PERIOD(ro)", using_metrics={k: fsx_metrics[k] for k in ['ro', 'wo']}, label="IOPS", period=minute)
+
+        # Shared by every site on the cluster, T3 hosts throttle or bill surplus credits once their balance is spent
+        cpu_credits = [
+            cw.Metric(namespace='AWS/EC2', metric_name=metric_name, dimensions={'AutoScalingGroupName': auto_scaling_group_name}, period=core.Duration.minutes(5), statistic='Average')
+            for metric_name in ['CPUCreditBalance', 'CPUSurplusCreditBalance']
+        ]
+
+        dashboard = cw.Dashboard(self, "Dashboard",
+            dashboard_name=stack.stack_name
+        )
+        dashboard.add_widgets(
+            cw.GraphWidget(title="Target response time", left=list(latency.values()), width=12),
+            cw.GraphWidget(title="Requests and target 5xx", left=[requests], right=[target_5xx], width=12)
+        )
+        dashboard.add_widgets(
+            cw.GraphWidget(title="Service CPU and memory %", left=[service.metric_cpu_utilization(period=minute), service.metric_memory_utilization(period=minute)], width=8),
+            cw.GraphWidget(title="FSx throughput and IOPS", left=[fsx_throughput], right=[fsx_iops], width=8),
+            cw.GraphWidget(title="Cluster host CPU credits", left=cpu_credits, width=8)
+        )
+
+        # Latency SLOs - Alarm when every one minute period of the evaluation window is over the target
+        # The topic is notified both when an alarm fires and when it clears
+        alarm_action = None
+        if self.settings['alarm_topic_arn'] is not None:
+            alarm_action = cw_actions.SnsAction(sns.Topic.from_topic_arn(self, 'AlarmTopic', self.settings['alarm_topic_arn']))
+        for statistic, threshold_ms in [('p90', self.settings['latency_p90_ms']), ('p99', self.settings['latency_p99_ms'])]:
+            # 0 turns the alarm off
+            if not threshold_ms:
+                continue
+            alarm = cw.Alarm(self, "Latency" + statistic.upper() + "Alarm",
+                metric=latency[statistic],
+                threshold=threshold_ms / 1000,
+                evaluation_periods=self.settings['evaluation_periods'],
+                comparison_operator=cw.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                treat_missing_data=cw.TreatMissingData.NOT_BREACHING,
+                alarm_description=stack.stack_name + " " + statistic + " target response time above " + str(threshold_ms) + " ms"
+            )
+            if alarm_action is not None:
+                alarm.add_alarm_action(alarm_action)
+                alarm.add_ok_action(alarm_action)
@@ -0,0 +1,161 @@
+"""Synth-time scheduled scaling windows for the cluster hosts and the site services.
+
+Pure Python with no AWS or CDK dependencies. A window raises (or lowers) the scaling bounds on some
+days of the week between a start and an end time in the schedule's time zone, e.g.
+
+    {"name": "weekday-peak", "days": "MON-FRI", "start": "07:00", "end": "19:00", "min_capacity": 4, "max_capacity": 10}
+
+Each window becomes two scheduled actions, one applying its bounds at the start and one restoring the
+baseline bounds at the end. Windows of the same schedule must not overlap or touch, as the end of one
+would reset the bounds while the other is still running.
+"""
+from capacity_planner import WINDOWS_RESERVED_MEMORY_MIB, plan_capacity
+
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def parse_days(spec: str) -> list:
+    # MON-FRI, SAT,SUN, MON,WED-FRI or * for every day, as sorted indexes into DAYS
+    if spec.strip() == '*':
+        return list(range(7))
+    days = set()
+    for part in spec.upper().split(','):
+        first, _, last = part.strip().partition('-')
+        if first not in DAYS or (last and last not in DAYS):
+            raise Exception("Invalid days '" + spec + "', expected day names such as MON-FRI or SAT,SUN")
+        start, end = DAYS.index(first), DAYS.index(last or first)
+        days.update(DAYS.index(DAYS[(start + i) % 7]) for i in range((end - start) % 7 + 1))
+    return sorted(days)
+
+
+def parse_time(value: str) -> int:
+    # HH:MM as minutes after midnight
+    hours, _, minutes = str(value).partition(':')
+    if not (hours.isdigit() and minutes.isdigit() and int(hours) < 24 and int(minutes) < 60):
+        raise Exception("Invalid time '" + str(value) + "', expected HH:MM")
+    return int(hours) * 60 + int(minutes)
+
+
+def get_schedule(windows: list, min_capacity: int, max_capacity: int, owner: str, allow_desired: bool = True) -> list:
+    # Normalized windows, validated against each other and the baseline bounds they return to
+    # Service scheduled actions only carry min and max, a window raises the task count through its min_capacity
+    schedule = []
+    names = set()
+    for window in windows or []:
+        name = window.get('name', '')
+        if not name or name in names:
+            raise Exception(owner + " has a scaling window without a unique name")
+        names.add(name)
+        start = parse_time(window.get('start', ''))
+        end = parse_time(window.get('end', ''))
+        if start == end:
+            raise Exception(owner + " scaling window " + name + " starts and ends at the same time")
+        entry = {
+            'name': name,
+            'days': parse_days(window.get('days', '*')),
+            'start': start,
+            # Windows ending at or before their start run past midnight
+            'end': end,
+            'min_capacity': window.get('min_capacity', min_capacity),
+            'max_capacity': window.get('max_capacity', max_capacity),
+            'desired_capacity': window.get('desired_capacity')
+        }
+        if not 0 <= entry['min_capacity'] <= entry['max_capacity']:
+            raise Exception(owner + " scaling window " + name + " needs 0 <= min_capacity <= max_capacity")
+        if entry['desired_capacity'] is not None and not allow_desired:
+            raise Exception(owner + " scaling window " + name + " can't set desired_capacity, raise its min_capacity instead")
+        if entry['desired_capacity'] is not None and not entry['min_capacity'] <= entry['desired_capacity'] <= entry['max_capacity']:
+            raise Exception(owner + " scaling window " + name + " has a desired_capacity outside its min_capacity and max_capacity")
+        schedule.append(entry)
+
+    for i, window in enumerate(schedule):
+        for other in schedule[i + 1:]:
+            clash = first_clash(window, other)
+            if clash is not None:
+                raise Exception(owner + " scaling windows " + window['name'] + " and " + other['name'] + " overlap or touch on " + format_minute(clash) + ", leave a gap between them")
+    return schedule
+
+
+def intervals(window: dict) -> list:
+    # [start, end) minutes of the week, split where a window runs past the end of Sunday
+    length = (window['end'] - window['start']) % MINUTES_PER_DAY
+    result = []
+    for day in window['days']:
+        start = day * MINUTES_PER_DAY + window['start']
+        end = start + length
+        if end > MINUTES_PER_WEEK:
+            result += [(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)]
+        else:
+            result.append((start, end))
+    return result
+
+
+def first_clash(window: dict, other: dict):
+    # Touching windows clash too, the end of one and the start of the other would fire at the same minute
+    for start, end in intervals(window):
+        for other_start, other_end in intervals(other):
+            # Also compare against the other window a week earlier and later, Sunday 24:00 is Monday 00:00
+            for shift in (-MINUTES_PER_WEEK, 0, MINUTES_PER_WEEK):
+                if start <= other_end + shift and other_start + shift <= end:
+                    return max(start, other_start + shift) % MINUTES_PER_WEEK
+    return None
+
+
+def format_minute(minute_of_week: int) -> str:
+    day, minute = divmod(minute_of_week, MINUTES_PER_DAY)
+    return DAYS[day] + ' %02d:%02d' % divmod(minute, 60)
+
+
+def active_window(schedule: list, minute_of_week: int):
+    for window in schedule:
+        for start, end in intervals(window):
+            if start <= minute_of_week < end:
+                return window
+    return None
+
+
+def end_days(window: dict) -> list:
+    # A window running past midnight ends on the following days
+    return sorted({(day + 1) % 7 for day in window['days']}) if window['end'] <= window['start'] else window['days']
+
+
+def cron_fields(minute_of_day: int, days: list) -> dict:
+    # Day names work in both the Auto Scaling and the Application Auto Scaling cron dialects
+    return {
+        'minute': str(minute_of_day % 60),
+        'hour': str(minute_of_day // 60),
+        'week_day': '*' if len(days) == 7 else ','.join(DAYS[day] for day in days)
+    }
+
+
+def scheduled_actions(schedule: list, min_capacity: int, max_capacity: int) -> list:
+    # (name, cron fields, min, max, desired) for the start and the end of every window
+    actions = []
+    for window in schedule:
+        actions.append((window['name'] + '-start', cron_fields(window['start'], window['days']), window['min_capacity'], window['max_capacity'], window['desired_capacity']))
+        actions.append((window['name'] + '-end', cron_fields(window['end'], end_days(window)), min_capacity, max_capacity, None))
+    return actions
+
+
+def check_scheduled_capacity(instance_types: dict, max_capacity: int, cluster_schedule: list, sites: list, site_schedules: dict, reserved_memory_mib: int = WINDOWS_RESERVED_MEMORY_MIB) -> list:
+    # Run the capacity plan for every combination of windows that is active at the same time
+    # Bounds only change at window starts and ends, so checking those minutes covers the whole week
+    moments = sorted({minute % MINUTES_PER_WEEK for schedule in [cluster_schedule] + list(site_schedules.values()) for window in schedule for interval in intervals(window) for minute in interval})
+    errors = []
+    checked = set()
+    for moment in moments:
+        cluster_window = active_window(cluster_schedule, moment)
+        instances = cluster_window['max_capacity'] if cluster_window else max_capacity
+        scheduled_sites = []
+        for site in sites:
+            site_window = active_window(site_schedules.get(site['name'], []), moment)
+            scheduled_sites.append(dict(site, max_capacity=site_window['max_capacity']) if site_window else site)
+        state = (instances, tuple(site.get('max_capacity') for site in scheduled_sites))
+        if state in checked:
+            continue
+        checked.add(state)
+        plan = plan_capacity(instance_types, instances, scheduled_sites, reserved_memory_mib)
+        errors += [format_minute(moment) + ": " + error for error in plan['errors']]
+    return errors
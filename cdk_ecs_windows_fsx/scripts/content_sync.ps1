@@ -0,0 +1,170 @@
+<#
+.SYNOPSIS
+One way incremental sync of site content from the FSx share to the container's local disk.
+
+.DESCRIPTION
+Builds a size/mtime manifest of Source and Destination, copies new and changed files and removes
+files that are gone from Source, so IIS serves local files and only changes cross SMB. After the first
+sync it keeps syncing every IntervalSeconds, or in watch mode as soon as the share reports a change.
+Each task keeps one status record (StatusDirectory\<TaskId>.json) that it overwrites, and only the
+StatusRecords most recently updated records are kept.
+
+Runs with Windows PowerShell in the container and with pwsh on Linux, dot source it to load the
+functions without starting a sync:
+    . ./content_sync.ps1
+    Compare-ContentManifest (Get-ContentManifest ./share) (Get-ContentManifest ./local)
+    pwsh ./content_sync.ps1 -Source ./share -Destination ./local -StatusDirectory ./status -Once
+#>
+param(
+    [string]$Source,
+    [string]$Destination,
+    [string]$StatusDirectory,
+    [string]$TaskId = [Environment]::MachineName,
+    [ValidateSet('interval', 'watch')]
+    [string]$Mode = 'interval',
+    [int]$IntervalSeconds = 30,
+    [int]$StatusRecords = 50,
+    [string]$ServiceMonitor,
+    [switch]$Once
+)
+
+# Relative path -> length and last write time (UTC ticks) of every file below Root
+function Get-ContentManifest([string]$Root) {
+    $manifest = @{}
+    if (Test-Path -LiteralPath $Root) {
+        $rootPath = (Resolve-Path -LiteralPath $Root).ProviderPath.TrimEnd('\', '/')
+        foreach ($file in Get-ChildItem -LiteralPath $rootPath -Recurse -File -Force) {
+            $manifest[$file.FullName.Substring($rootPath.Length + 1)] = [pscustomobject]@{
+                Length = $file.Length
+                LastWriteTimeUtc = $file.LastWriteTimeUtc.Ticks
+            }
+        }
+    }
+    return $manifest
+}
+
+# Paths to copy (new or changed size/mtime) and to remove (gone from the source), both sorted
+function Compare-ContentManifest([hashtable]$SourceManifest, [hashtable]$DestinationManifest) {
+    $copy = foreach ($path in $SourceManifest.Keys) {
+        $entry = $DestinationManifest[$path]
+        if ($null -eq $entry -or $entry.Length -ne $SourceManifest[$path].Length -or $entry.LastWriteTimeUtc -ne $SourceManifest[$path].LastWriteTimeUtc) {
+            $path
+        }
+    }
+    $remove = foreach ($path in $DestinationManifest.Keys) {
+        if (-not $SourceManifest.ContainsKey($path)) {
+            $path
+        }
+    }
+    return [pscustomobject]@{
+        Copy = @($copy | Sort-Object)
+        Remove = @($remove | Sort-Object)
+    }
+}
+
+function Sync-Content([string]$Source, [string]$Destination) {
+    $sourceManifest = Get-ContentManifest $Source
+    $diff = Compare-ContentManifest $sourceManifest (Get-ContentManifest $Destination)
+    $failed = 0
+
+    foreach ($path in $diff.Copy) {
+        $target = Join-Path $Destination $path
+        $partial = $target + '.partial'
+        try {
+            New-Item -Path (Split-Path -Parent $target) -ItemType Directory -Force | Out-Null
+            # Copy under a temporary name and rename, IIS never serves a half written file
+            Copy-Item -LiteralPath (Join-Path $Source $path) -Destination $partial -Force -ErrorAction Stop
+            # The source mtime is what the next manifest compares against
+            (Get-Item -LiteralPath $partial).LastWriteTimeUtc = [datetime]::new($sourceManifest[$path].LastWriteTimeUtc, [DateTimeKind]::Utc)
+            Move-Item -LiteralPath $partial -Destination $target -Force -ErrorAction Stop
+        } catch {
+            # Usually a file changed or removed mid sync, the next sync picks it up
+            Write-Warning "Copy of $path failed: $_"
+            Remove-Item -LiteralPath $partial -Force -ErrorAction SilentlyContinue
+            $failed++
+        }
+    }
+
+    foreach ($path in $diff.Remove) {
+        Remove-Item -LiteralPath (Join-Path $Destination $path) -Force -ErrorAction SilentlyContinue
+    }
+
+    return [pscustomobject]@{
+        Files = $sourceManifest.Count
+        Copied = $diff.Copy.Count - $failed
+        Removed = $diff.Remove.Count
+        Failed = $failed
+    }
+}
+
+function Write-StatusRecord([string]$StatusDirectory, [string]$TaskId, $Status, [int]$StatusRecords) {
+    New-Item -Path $StatusDirectory -ItemType Directory -Force | Out-Null
+    $Status | ConvertTo-Json -Compress | Set-Content -LiteralPath (Join-Path $StatusDirectory ($TaskId + '.json')) -Encoding UTF8
+    # Stopped tasks stop updating their record and age out
+    Get-ChildItem -LiteralPath $StatusDirectory -Filter '*.json' -File |
+        Sort-Object LastWriteTimeUtc -Descending |
+        Select-Object -Skip $StatusRecords |
+        Remove-Item -Force -ErrorAction SilentlyContinue
+}
+
+# Dot sourced, only load the functions
+if ($MyInvocation.InvocationName -eq '.') {
+    return
+}
+
+if (-not $Source -or -not $Destination) {
+    throw 'Source and Destination are required'
+}
+
+$started = (Get-Date).ToUniversalTime().ToString('o')
+$monitor = $null
+$watcher = $null
+if ($Mode -eq 'watch') {
+    # SMB change notifications, the interval stays as a fallback for missed events
+    $watcher = New-Object System.IO.FileSystemWatcher $Source
+    $watcher.IncludeSubdirectories = $true
+}
+
+while ($true) {
+    $status = [ordered]@{ TaskId = $TaskId; Started = $started; LastSync = (Get-Date).ToUniversalTime().ToString('o') }
+    try {
+        $result = Sync-Content $Source $Destination
+        $status.Files = $result.Files
+        $status.Copied = $result.Copied
+        $status.Removed = $result.Removed
+        $status.Failed = $result.Failed
+    } catch {
+        Write-Warning "Sync failed: $_"
+        $status.Error = "$_"
+    }
+
+    if ($StatusDirectory) {
+        try {
+            Write-StatusRecord $StatusDirectory $TaskId $status $StatusRecords
+        } catch {
+            Write-Warning "Status record failed: $_"
+        }
+    }
+
+    if ($Once) {
+        break
+    }
+
+    # IIS starts once the first sync finished, the container stops when its service monitor exits
+    if ($ServiceMonitor -and $null -eq $monitor) {
+        $monitor = Start-Process -FilePath $ServiceMonitor -ArgumentList 'w3svc' -NoNewWindow -PassThru
+    }
+    if ($null -ne $monitor -and $monitor.HasExited) {
+        exit $monitor.ExitCode
+    }
+
+    if ($null -ne $watcher) {
+        $change = $watcher.WaitForChanged([System.IO.WatcherChangeTypes]::All, $IntervalSeconds * 1000)
+        if (-not $change.TimedOut) {
+            # Let a burst of changes settle before syncing
+            Start-Sleep -Seconds 2
+        }
+    } else {
+        Start-Sleep -Seconds $IntervalSeconds
+    }
+}
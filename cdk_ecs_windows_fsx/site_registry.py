@@ -0,0 +1,68 @@
+import simplejson as json
+
+# Values used for any setting a site does not declare in the registry
+SITE_DEFAULTS = {
+    'cpu': 512,
+    'memory': 1024,
+    'host_port': 0,
+    'desired_count': 2,
+    'root_directory': 'share',
+    'load_balancer': 'shared',
+    'content_sync_mode': 'watch',
+    'content_sync_interval': 30,
+    'target_group_preset': 'balanced',
+    'placement': 'spread-binpack',
+    'fsx_az_affinity': False,
+    'iis_preset': 'stock',
+}
+
+def load_sites(app):
+    # The registry is either a JSON file named by the site_registry context value or the sites context value itself
+    # Both have the shape {"<site name>": {<site settings>}}, see cdk.json
+    registry_file = app.node.try_get_context('site_registry')
+    if registry_file:
+        with open(registry_file) as fp:
+            registry = json.load(fp)
+    else:
+        registry = app.node.try_get_context('sites') or {}
+
+    sites = []
+    sub_domains = set()
+    site_directories = set()
+    priorities = {}
+    for name, settings in registry.items():
+        site = dict(SITE_DEFAULTS)
+        site.update(settings or {})
+        site['name'] = name
+        site.setdefault('sub_domain', name)
+        site.setdefault('site_directory', name)
+
+        # The task command puts the directory in a double quoted PowerShell string, where $ and ` would be expanded
+        if not site['site_directory'] or any(c in site['site_directory'] for c in '\\/:*?"<>|$`'):
+            raise Exception("Site " + name + " has an invalid site_directory " + repr(site['site_directory']) + ", it must be a single directory name without $ or `")
+        if site['site_directory'].lower() in site_directories:
+            raise Exception("Site " + name + " reuses site_directory " + site['site_directory'] + ", site directories must be unique")
+        site_directories.add(site['site_directory'].lower())
+
+        # The ALB stacks only open the Windows ephemeral range to the hosts, a pinned port outside it is unreachable
+        if site['host_port'] and not 49152 <= site['host_port'] <= 65535:
+            raise Exception("Site " + name + " pins host_port " + str(site['host_port']) + ", a fixed host port must be in the 49152-65535 range the load balancers can reach")
+
+        if site['sub_domain'] in sub_domains:
+            raise Exception("Site " + name + " reuses sub_domain " + site['sub_domain'] + ", sub domains must be unique")
+        sub_domains.add(site['sub_domain'])
+
+        # Listener rule priorities must be unique per load balancer, sites without one are numbered in registry order
+        used = priorities.setdefault(site['load_balancer'], set())
+        if 'priority' not in site:
+            site['priority'] = max(used, default=0) + 1
+        if site['priority'] in used:
+            raise Exception("Site " + name + " reuses listener rule priority " + str(site['priority']) + " on load balancer " + site['load_balancer'])
+        used.add(site['priority'])
+
+        sites.append(site)
+
+    if not sites:
+        raise Exception("Please provide at least one site via the sites context variable or a site_registry file")
+
+    return sites
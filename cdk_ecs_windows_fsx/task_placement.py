@@ -0,0 +1,39 @@
+from aws_cdk import (
+    aws_ecs as ecs
+)
+
+AVAILABILITY_ZONE = 'attribute:ecs.availability-zone'
+
+# Named task placement strategies for site services as (type, field) pairs, evaluated in order
+# https://docs.aws.amazon.com/AmazonECS/latest/developerguide/task-placement-strategies.html
+PLACEMENT_STRATEGIES = {
+    # Balance tasks over the AZs, then fill the fullest host within an AZ so scale in frees whole hosts
+    'spread-binpack': [('spread', AVAILABILITY_ZONE), ('binpack', 'memory')],
+    # Balance tasks over the AZs, then over the hosts within an AZ
+    'spread': [('spread', AVAILABILITY_ZONE), ('spread', 'instanceId')],
+    # Fewest hosts, tasks may all land in one AZ
+    'binpack': [('binpack', 'memory')],
+}
+
+def get_placement(strategy: str, availability_zone: str = None) -> dict:
+    # Placement strategies and constraints for an Ec2Service, availability_zone pins tasks to a single AZ
+    if strategy not in PLACEMENT_STRATEGIES:
+        raise Exception("Unknown placement strategy " + strategy + ", choose one of " + ", ".join(PLACEMENT_STRATEGIES))
+
+    steps = PLACEMENT_STRATEGIES[strategy]
+    constraints = []
+    if availability_zone is not None:
+        # ECS has no soft AZ preference, a memberOf constraint is all or nothing so spreading over AZs is moot
+        constraints.append(ecs.PlacementConstraint.member_of(AVAILABILITY_ZONE + ' == ' + availability_zone))
+        steps = [step for step in steps if step[1] != AVAILABILITY_ZONE]
+
+    strategies = []
+    for placement_type, field in steps:
+        if placement_type == 'spread':
+            strategies.append(ecs.PlacementStrategy.spread_across(field))
+        else:
+            strategies.append(ecs.PlacementStrategy.packed_by(ecs.BinPackResource.MEMORY))
+    return {
+        'placement_strategies': strategies,
+        'placement_constraints': constraints
+    }
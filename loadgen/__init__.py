@@ -0,0 +1,7 @@
+"""HTTP load generator for comparing site scaling and tuning settings.
+
+    python -m loadgen https://website1.example.com --stage 30s:50 --stage 2m:200 --output results.json
+"""
+from loadgen.histogram import Histogram
+from loadgen.client import ConnectionPool
+from loadgen.runner import Stage, parse_stage, run
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from loadgen.runner import MODES, parse_stage, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='loadgen', description=__import__('loadgen').__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url', help='Target URL, http or https')
+    parser.add_argument('--stage', action='append', type=parse_stage, dest='stages', metavar='DURATION:TARGET',
+        help='Ramp linearly to TARGET over DURATION (e.g. 30s:50, 2m:200), repeat for more stages (default 30s:10)')
+    parser.add_argument('--mode', choices=MODES, default='rps', help='Stage targets are requests per second (open loop) or concurrent workers (closed loop)')
+    parser.add_argument('--start', type=float, default=0.0, help='Target the first stage ramps from (default 0)')
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('--header', action='append', default=[], metavar='NAME:VALUE', help='Extra request header, repeatable')
+    parser.add_argument('--max-connections', type=int, default=64, help='Connection pool size, also the cap on requests in flight')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per request timeout in seconds')
+    parser.add_argument('--insecure', action='store_true', help="Don't verify TLS certificates")
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    headers = {}
+    for header in args.header:
+        name, _, value = header.partition(':')
+        headers[name.strip()] = value.strip()
+
+    results = asyncio.run(run(args.url, args.stages or [parse_stage('30s:10')],
+        mode=args.mode,
+        start=args.start,
+        method=args.method.upper(),
+        max_connections=args.max_connections,
+        timeout=args.timeout,
+        verify_tls=not args.insecure,
+        headers=headers
+    ))
+
+    # One line summary on stderr, the full results as JSON
+    percentiles = results['latency']['response']['percentiles_ms']
+    print('%d requests in %.1fs (%.1f rps), %d errors, p50 %.1fms p99 %.1fms p99.9 %.1fms' % (
+        results['requests'], results['elapsed_seconds'], results['achieved_rps'], sum(results['errors'].values()),
+        percentiles['p50'], percentiles['p99'], percentiles['p99_9']), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
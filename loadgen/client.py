@@ -0,0 +1,159 @@
+"""Minimal asyncio HTTP/1.1 client with a keep-alive connection pool.
+
+Only what a load generator needs: GET/HEAD style requests against a single origin, Content-Length,
+chunked and read-to-close bodies, and connection reuse. Bodies are drained and counted, not kept.
+"""
+import asyncio
+import collections
+import ssl
+import time
+from urllib.parse import urlsplit
+
+# seconds is the service time, from getting a connection slot to the end of the response
+Response = collections.namedtuple('Response', ['status', 'body_bytes', 'reused', 'seconds'])
+
+
+class HttpError(Exception):
+    pass
+
+
+class Connection:
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ConnectionPool:
+
+    def __init__(self, url: str, max_connections: int = 64, timeout: float = 10.0, verify_tls: bool = True, headers: dict = None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError("Unsupported URL scheme: " + url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        self.timeout = timeout
+        self.ssl_context = None
+        if parts.scheme == 'https':
+            self.ssl_context = ssl.create_default_context()
+            if not verify_tls:
+                self.ssl_context.check_hostname = False
+                self.ssl_context.verify_mode = ssl.CERT_NONE
+        host_header = self.host if parts.port is None else self.host + ':' + str(parts.port)
+        self.headers = {'Host': host_header, 'User-Agent': 'loadgen', 'Accept': '*/*', 'Connection': 'keep-alive'}
+        self.headers.update(headers or {})
+        self.max_connections = max_connections
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle = collections.deque()
+        self.opened = 0
+
+    async def connect(self) -> Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port,
+            ssl=self.ssl_context,
+            server_hostname=self.host if self.ssl_context else None
+        )
+        self.opened += 1
+        return Connection(reader, writer)
+
+    async def request(self, method: str = 'GET', path: str = None) -> Response:
+        # A slot is held for the whole exchange, so max_connections bounds both sockets and requests in flight
+        # The service time starts once a slot is free, time spent waiting for one is queueing
+        async with self.slots:
+            started = time.perf_counter()
+            status, body_bytes, reused = await asyncio.wait_for(self.exchange(method, path or self.path), self.timeout)
+            return Response(status, body_bytes, reused, time.perf_counter() - started)
+
+    async def exchange(self, method: str, path: str) -> tuple:
+        connection = self.idle.popleft() if self.idle else None
+        if connection is not None:
+            try:
+                return await self.send(connection, method, path, reused=True)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server closed an idle keep-alive connection, retry once on a fresh one
+                connection.close()
+        connection = await self.connect()
+        return await self.send(connection, method, path, reused=False)
+
+    async def send(self, connection: Connection, method: str, path: str, reused: bool) -> tuple:
+        lines = [method + ' ' + path + ' HTTP/1.1'] + [name + ': ' + value for name, value in self.headers.items()]
+        try:
+            connection.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await connection.writer.drain()
+            status, keep_alive, body_bytes = await self.read_response(connection.reader, method)
+        except BaseException:
+            connection.close()
+            raise
+        connection.requests += 1
+        if keep_alive:
+            self.idle.append(connection)
+        else:
+            connection.close()
+        return status, body_bytes, reused
+
+    async def read_response(self, reader: asyncio.StreamReader, method: str) -> tuple:
+        status_line = await reader.readuntil(b'\r\n')
+        parts = status_line.decode('latin-1').split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise HttpError("Malformed status line: " + repr(status_line))
+        version, status = parts[0], int(parts[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection_header = headers.get('connection', '').lower()
+        keep_alive = connection_header != 'close' and (version != 'HTTP/1.0' or connection_header == 'keep-alive')
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return status, keep_alive, 0
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            return status, keep_alive, await self.read_chunked(reader)
+        if 'content-length' in headers:
+            length = int(headers['content-length'])
+            await reader.readexactly(length)
+            return status, keep_alive, length
+        # No framing, the body runs until the server closes the connection
+        body = await reader.read()
+        return status, False, len(body)
+
+    @staticmethod
+    async def read_chunked(reader: asyncio.StreamReader) -> int:
+        total = 0
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            if size == 0:
+                # Skip trailers up to the final empty line
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return total
+            await reader.readexactly(size + 2)
+            total += size
+
+    async def close(self) -> None:
+        while self.idle:
+            connection = self.idle.popleft()
+            connection.close()
+            try:
+                await connection.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+async def timed_request(pool: ConnectionPool, method: str = 'GET') -> tuple:
+    # (response or None, error name or None, seconds), the service time for responses and the time until the error otherwise
+    started = time.perf_counter()
+    try:
+        response = await pool.request(method)
+        return response, None, response.seconds
+    except asyncio.TimeoutError:
+        return None, 'timeout', time.perf_counter() - started
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, HttpError, ValueError) as error:
+        return None, type(error).__name__, time.perf_counter() - started
@@ -0,0 +1,80 @@
+"""HDR-style latency histogram.
+
+Values are recorded as integer microseconds into log-linear buckets: every power of two range is
+split into 2**(SUB_BUCKET_BITS - 1) equal buckets, so any recorded value is reproduced within
+2**-(SUB_BUCKET_BITS - 1) of itself (about 0.1%) whatever its magnitude, in a bounded amount of memory.
+"""
+import math
+
+SUB_BUCKET_BITS = 11
+
+
+class Histogram:
+
+    def __init__(self, sub_bucket_bits: int = SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket_key(self, value: int) -> tuple:
+        # (exponent, mantissa) with the mantissa holding the top sub_bucket_bits bits of the value
+        exponent = max(0, value.bit_length() - self.sub_bucket_bits)
+        return exponent, value >> exponent
+
+    @staticmethod
+    def bucket_range(key: tuple) -> tuple:
+        exponent, mantissa = key
+        return mantissa << exponent, ((mantissa + 1) << exponent) - 1
+
+    def record(self, microseconds: int, count: int = 1) -> None:
+        value = max(0, int(microseconds))
+        key = self.bucket_key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def record_seconds(self, seconds: float) -> None:
+        self.record(round(seconds * 1000000))
+
+    def merge(self, other: 'Histogram') -> None:
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Can't merge histograms with different precision")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percentile: float) -> int:
+        # Highest value equivalent to the bucket holding the percentile, capped at the exact maximum
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return min(self.bucket_range(key)[1], self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self, percentiles=(50, 75, 90, 95, 99, 99.9, 99.99)) -> dict:
+        # Milliseconds for readability, buckets as [lower bound us, count] to rebuild or plot the distribution
+        return {
+            'count': self.count,
+            'min_ms': (self.min or 0) / 1000,
+            'mean_ms': round(self.mean() / 1000, 3),
+            'max_ms': (self.max or 0) / 1000,
+            'percentiles_ms': {('p' + str(p)).replace('.', '_'): self.percentile(p) / 1000 for p in percentiles},
+            'buckets_us': [[self.bucket_range(key)[0], self.buckets[key]] for key in sorted(self.buckets)]
+        }
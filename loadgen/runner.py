@@ -0,0 +1,182 @@
+"""Load profiles and the run loop.
+
+A profile is a list of stages, each ramping linearly from the previous stage's target to its own
+over its duration (the first stage ramps from `start`). In `rps` mode the target is requests per second
+and requests are sent open loop on a fixed schedule, so a slow server can't slow the sender down;
+response latency is then measured from the scheduled send time and service latency from the moment
+a connection slot is free, the difference being time spent queued (coordinated omission). In
+`concurrency` mode the target is the number of workers each sending requests back to back, and
+response latency runs from the worker's send, so it includes waiting for a slot when there are
+more workers than connections.
+"""
+import asyncio
+import collections
+import math
+import time
+
+from loadgen.client import ConnectionPool, timed_request
+from loadgen.histogram import Histogram
+
+Stage = collections.namedtuple('Stage', ['duration', 'target'])
+
+MODES = ['rps', 'concurrency']
+
+
+def parse_stage(value: str) -> Stage:
+    # DURATION:TARGET, the duration in seconds with an optional s/m suffix, e.g. 30s:50 or 2m:200
+    duration, _, target = value.partition(':')
+    seconds = float(duration[:-1]) * (60 if duration.endswith('m') else 1) if duration[-1:] in ('s', 'm') else float(duration)
+    if seconds <= 0 or not target or float(target) < 0:
+        raise ValueError("Invalid stage '" + value + "', expected DURATION:TARGET such as 30s:50")
+    return Stage(seconds, float(target))
+
+
+def target_at(stages: list, elapsed: float, start: float = 0.0) -> float:
+    previous = start
+    for stage in stages:
+        if elapsed < stage.duration:
+            return previous + (stage.target - previous) * elapsed / stage.duration
+        elapsed -= stage.duration
+        previous = stage.target
+    return previous
+
+
+def send_schedule(stages: list, start: float = 0.0):
+    # Yields send offsets in seconds: request n goes out when the integral of the rate reaches n
+    offset = 0.0
+    sent = 0.0
+    previous = start
+    for stage in stages:
+        rate_from, slope = previous, (stage.target - previous) / stage.duration
+        stage_requests = (rate_from + stage.target) / 2 * stage.duration
+        due = math.floor(sent) + 1 - sent
+        while due <= stage_requests + 1e-9:
+            # Solve rate_from * t + slope / 2 * t^2 = due for t
+            if abs(slope) < 1e-12:
+                t = due / rate_from
+            else:
+                t = (-rate_from + math.sqrt(max(0.0, rate_from * rate_from + 2 * slope * due))) / slope
+            yield offset + t
+            due += 1
+        sent += stage_requests
+        offset += stage.duration
+        previous = stage.target
+
+
+class Results:
+
+    def __init__(self):
+        self.response_latency = Histogram()
+        self.service_latency = Histogram()
+        self.statuses = collections.Counter()
+        self.errors = collections.Counter()
+        self.timeline = collections.defaultdict(lambda: {'sent': 0, 'completed': 0, 'errors': 0})
+        self.body_bytes = 0
+        self.reused = 0
+
+    def record(self, second: int, response, error, service_seconds: float, response_seconds: float) -> None:
+        point = self.timeline[second]
+        point['completed'] += 1
+        if error is not None:
+            self.errors[error] += 1
+            point['errors'] += 1
+            return
+        self.statuses[str(response.status)] += 1
+        self.body_bytes += response.body_bytes
+        self.reused += response.reused
+        self.service_latency.record_seconds(service_seconds)
+        self.response_latency.record_seconds(response_seconds)
+
+
+async def run_rps(pool: ConnectionPool, stages: list, start: float, method: str, results: Results) -> None:
+    began = time.perf_counter()
+    pending = set()
+
+    async def fire(scheduled: float) -> None:
+        response, error, service_seconds = await timed_request(pool, method)
+        results.record(int(scheduled), response, error, service_seconds, time.perf_counter() - began - scheduled)
+
+    for scheduled in send_schedule(stages, start):
+        delay = scheduled - (time.perf_counter() - began)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        results.timeline[int(scheduled)]['sent'] += 1
+        task = asyncio.ensure_future(fire(scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def run_concurrency(pool: ConnectionPool, stages: list, start: float, method: str, results: Results) -> None:
+    began = time.perf_counter()
+    duration = sum(stage.duration for stage in stages)
+    workers = []
+
+    async def worker(index: int) -> None:
+        while True:
+            elapsed = time.perf_counter() - began
+            # Workers above the current target stop, the controller starts new ones as it rises again
+            if elapsed >= duration or index >= math.ceil(target_at(stages, elapsed, start)):
+                return
+            results.timeline[int(elapsed)]['sent'] += 1
+            sent = time.perf_counter()
+            response, error, service_seconds = await timed_request(pool, method)
+            results.record(int(elapsed), response, error, service_seconds, time.perf_counter() - sent)
+
+    while True:
+        elapsed = time.perf_counter() - began
+        if elapsed >= duration:
+            break
+        wanted = math.ceil(target_at(stages, elapsed, start))
+        workers = [task for task in workers if not task.done()]
+        running = {task.index for task in workers}
+        for index in range(wanted):
+            if index not in running:
+                task = asyncio.ensure_future(worker(index))
+                task.index = index
+                workers.append(task)
+        await asyncio.sleep(0.1)
+    if workers:
+        await asyncio.wait(workers)
+
+
+async def run(url: str, stages: list, mode: str = 'rps', start: float = 0.0, method: str = 'GET', max_connections: int = 64, timeout: float = 10.0, verify_tls: bool = True, headers: dict = None) -> dict:
+    if mode not in MODES:
+        raise ValueError("Unknown mode '" + mode + "', expected one of: " + ", ".join(MODES))
+    if not stages:
+        raise ValueError("At least one stage is required")
+    pool = ConnectionPool(url, max_connections=max_connections, timeout=timeout, verify_tls=verify_tls, headers=headers)
+    results = Results()
+    began = time.perf_counter()
+    try:
+        if mode == 'rps':
+            await run_rps(pool, stages, start, method, results)
+        else:
+            await run_concurrency(pool, stages, start, method, results)
+    finally:
+        await pool.close()
+    elapsed = time.perf_counter() - began
+    completed = results.service_latency.count + sum(results.errors.values())
+
+    return {
+        'url': url,
+        'method': method,
+        'mode': mode,
+        'stages': [{'duration': stage.duration, 'target': stage.target} for stage in stages],
+        'start': start,
+        'max_connections': max_connections,
+        'elapsed_seconds': round(elapsed, 3),
+        'requests': completed,
+        'achieved_rps': round(completed / elapsed, 2) if elapsed else 0,
+        'statuses': dict(results.statuses),
+        'errors': dict(results.errors),
+        'body_bytes': results.body_bytes,
+        'connections_opened': pool.opened,
+        'connections_reused': results.reused,
+        'latency': {
+            'response': results.response_latency.to_dict(),
+            'service': results.service_latency.to_dict()
+        },
+        'timeline': [dict(second=second, **results.timeline[second]) for second in sorted(results.timeline)]
+    }
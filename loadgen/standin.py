@@ -0,0 +1,62 @@
+"""Stand-in HTTP server for running the load generator locally.
+
+Serves a fixed body on every GET/HEAD with HTTP/1.1 keep-alive, optionally after a delay:
+
+    python -m loadgen.standin --port 8080 --delay-ms 5
+    python -m loadgen http://127.0.0.1:8080/ --stage 10s:100
+"""
+import argparse
+import http.server
+import time
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes, without this Nagle and delayed ACKs add ~40ms to every response
+    disable_nagle_algorithm = True
+    body = b'<html><body>stand-in</body></html>'
+    delay = 0.0
+
+    def do_GET(self):
+        self.respond(self.body)
+
+    def do_HEAD(self):
+        self.respond(b'')
+
+    def respond(self, body):
+        if self.delay:
+            time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8080, delay_ms=0.0, body_bytes=None):
+    attributes = {'delay': delay_ms / 1000}
+    if body_bytes is not None:
+        attributes['body'] = b'x' * body_bytes
+    handler = type('Handler', (StandInHandler,), attributes)
+    return http.server.ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='loadgen.standin', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='Sleep before each response')
+    parser.add_argument('--body-bytes', type=int, help='Response body size (default a small HTML page)')
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.delay_ms, args.body_bytes)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,18 @@ setuptools.setup(
         "aws_cdk.aws_directoryservice==1.84.0",
         "aws_cdk.aws_fsx==1.84.0",
         "aws_cdk.custom_resources==1.84.0",
+        "aws_cdk.aws_certificatemanager==1.84.0",
+        "aws_cdk.aws_route53_targets==1.84.0",
+        "aws_cdk.aws_lambda==1.84.0",
+        "aws_cdk.aws_imagebuilder==1.84.0",
+        "aws_cdk.aws_events==1.84.0",
+        "aws_cdk.aws_events_targets==1.84.0",
+        "aws_cdk.aws_cloudfront==1.84.0",
+        "aws_cdk.aws_cloudfront_origins==1.84.0",
+        "aws_cdk.aws_cloudwatch==1.84.0",
+        "aws_cdk.aws_cloudwatch_actions==1.84.0",
+        "aws_cdk.aws_sns==1.84.0",
+        "aws_cdk.aws_route53resolver==1.84.0",
         "boto3==1.16.22",
         "simplejson==3.17.2"
     ],
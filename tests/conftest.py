@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules inside the package import each other by their top level names, the same way the CDK app runs them
+for path in (ROOT, os.path.join(ROOT, 'cdk_ecs_windows_fsx')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+class Assembly:
+    # The synthesized cloud assembly, templates by stack name and the manifest
+    def __init__(self, outdir):
+        with open(os.path.join(outdir, 'manifest.json')) as fp:
+            self.manifest = json.load(fp)
+        self.templates = {}
+        for name, artifact in self.manifest['artifacts'].items():
+            if artifact['type'] == 'aws:cloudformation:stack':
+                with open(os.path.join(outdir, artifact['properties']['templateFile'])) as fp:
+                    self.templates[name] = json.load(fp)
+
+    def dependencies(self, stack):
+        return set(self.manifest['artifacts'][stack].get('dependencies', []))
+
+    def resources(self, stack, resource_type):
+        # {logical id: properties} of the stack's resources of one type
+        return {logical_id: resource.get('Properties', {}) for logical_id, resource in self.templates[stack]['Resources'].items() if resource['Type'] == resource_type}
+
+
+@pytest.fixture(scope='session')
+def synth(tmp_path_factory):
+    # Synthesizes app.py the way the CDK CLI does, offline with placeholder zone values, once per distinct context
+    pytest.importorskip('aws_cdk.core')
+    pytest.importorskip('simplejson')
+    with open(os.path.join(ROOT, 'cdk.json')) as fp:
+        base_context = json.load(fp)['context']
+    assemblies = {}
+
+    def synth(**context):
+        key = json.dumps(context, sort_keys=True)
+        if key not in assemblies:
+            outdir = str(tmp_path_factory.mktemp('cdk.out'))
+            full_context = dict(base_context, offline='true', account='123456789012', zone_name='example.com', hosted_zone_id='Z0123456789ABCDEFGHIJ', **context)
+            environment = dict(os.environ, CDK_CONTEXT_JSON=json.dumps(full_context), CDK_OUTDIR=outdir, JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION='1')
+            completed = subprocess.run([sys.executable, 'app.py'], cwd=ROOT, env=environment, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            assert completed.returncode == 0, completed.stderr
+            assemblies[key] = Assembly(outdir)
+        return assemblies[key]
+    return synth
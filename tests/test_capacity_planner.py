@@ -0,0 +1,71 @@
+import pytest
+
+from capacity_planner import WINDOWS_RESERVED_MEMORY_MIB, pack, plan_capacity, tasks_per_instance
+from capacity_profiles import INSTANCE_TYPES
+from site_registry import load_sites
+
+T3_MEDIUM = {'t3.medium': INSTANCE_TYPES['t3.medium']}
+
+
+def site(name='website1', cpu=512, memory=1024, host_port=0, desired_count=2, max_capacity=None):
+    return {'name': name, 'cpu': cpu, 'memory': memory, 'host_port': host_port, 'desired_count': desired_count, 'max_capacity': max_capacity}
+
+
+def test_windows_reservation_limits_tasks_per_host():
+    # 4096 MiB nominal, ECS only offers what is left after Windows
+    assert tasks_per_instance(INSTANCE_TYPES['t3.medium'], site()) == {'tasks': 3, 'limited_by': 'memory'}
+    assert tasks_per_instance(INSTANCE_TYPES['t3.medium'], site(), reserved_memory_mib=0)['tasks'] == 4
+
+
+def test_four_1024_mib_tasks_do_not_fit_one_t3_medium():
+    plan = plan_capacity(T3_MEDIUM, 1, [site(desired_count=4)])
+    assert not plan['feasible']
+    assert plan['errors'] == ["Site website1 can't place 1 of its 4 peak tasks on 1 x t3.medium"]
+
+
+def test_plan_reports_headroom():
+    plan = plan_capacity(T3_MEDIUM, 2, [site(desired_count=2, max_capacity=4)])
+    assert plan['feasible']
+    assert plan['sites'][0]['peak_tasks'] == 4
+    assert plan['sites'][0]['headroom'] == 2
+
+
+def test_fixed_host_port_limits_one_task_per_host():
+    assert tasks_per_instance(INSTANCE_TYPES['t3.large'], site(host_port=50000))['limited_by'] == 'ports'
+    assert pack(INSTANCE_TYPES['t3.large'], 2, [(site(host_port=50000), 3)]) == [('website1', 1)]
+
+
+def test_site_too_large_for_instance():
+    plan = plan_capacity(T3_MEDIUM, 2, [site(cpu=4096)])
+    assert plan['errors'][0].startswith('Site website1 needs 4096 CPU units')
+
+
+def test_plan_uses_smallest_instance_type():
+    plan = plan_capacity({t: INSTANCE_TYPES[t] for t in ('t3.medium', 't3.large')}, 2, [site()])
+    assert plan['instance_type'] == 't3.medium'
+    assert WINDOWS_RESERVED_MEMORY_MIB > 0
+
+
+class Node:
+
+    def __init__(self, context):
+        self.context = context
+
+    def try_get_context(self, key):
+        return self.context.get(key)
+
+
+class App:
+
+    def __init__(self, sites):
+        self.node = Node({'sites': sites})
+
+
+@pytest.mark.parametrize('host_port', [80, 8080, 49151])
+def test_registry_rejects_unreachable_host_port(host_port):
+    with pytest.raises(Exception, match='49152-65535'):
+        load_sites(App({'website1': {'host_port': host_port}}))
+
+
+def test_registry_accepts_ephemeral_host_port():
+    assert load_sites(App({'website1': {'host_port': 50080}}))[0]['host_port'] == 50080
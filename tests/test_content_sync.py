@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+PWSH = shutil.which('pwsh')
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cdk_ecs_windows_fsx', 'scripts', 'content_sync.ps1')
+
+pytestmark = pytest.mark.skipif(PWSH is None, reason='needs PowerShell (pwsh)')
+
+
+def pwsh(command, cwd):
+    completed = subprocess.run([PWSH, '-NoProfile', '-NonInteractive', '-Command', command], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout
+
+
+def write(root, path, content, mtime=1600000000):
+    path = os.path.join(root, *path.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def content(tmp_path):
+    share, local = str(tmp_path / 'share'), str(tmp_path / 'local')
+    write(share, 'index.html', 'same')
+    write(local, 'index.html', 'same')
+    write(share, 'css/site.css', 'new')
+    write(share, 'about.html', 'longer')
+    write(local, 'about.html', 'short')
+    write(share, 'touched.html', 'same', mtime=1600000060)
+    write(local, 'touched.html', 'same')
+    write(local, 'old.html', 'gone')
+    return tmp_path
+
+
+def test_compare_manifest(content):
+    output = pwsh(
+        ". '" + SCRIPT + "'; "
+        "Compare-ContentManifest (Get-ContentManifest ./share) (Get-ContentManifest ./local) | ConvertTo-Json -Compress",
+        str(content)
+    )
+    diff = json.loads(output)
+    assert diff['Copy'] == sorted(['about.html', os.path.join('css', 'site.css'), 'touched.html'])
+    assert diff['Remove'] == ['old.html']
+
+
+def test_manifest_of_missing_directory_is_empty(tmp_path):
+    assert pwsh(". '" + SCRIPT + "'; (Get-ContentManifest ./missing).Count", str(tmp_path)).strip() == '0'
+
+
+def test_sync_once(content):
+    pwsh("& '" + SCRIPT + "' -Source ./share -Destination ./local -StatusDirectory ./status -TaskId task1 -Once", str(content))
+
+    for path in ('index.html', 'css/site.css', 'about.html', 'touched.html'):
+        with open(str(content / 'share' / path)) as source, open(str(content / 'local' / path)) as copy:
+            assert source.read() == copy.read()
+        assert os.stat(str(content / 'share' / path)).st_mtime == os.stat(str(content / 'local' / path)).st_mtime
+    assert not (content / 'local' / 'old.html').exists()
+
+    with open(str(content / 'status' / 'task1.json'), encoding='utf-8-sig') as fp:
+        status = json.load(fp)
+    assert (status['TaskId'], status['Files'], status['Copied'], status['Removed'], status['Failed']) == ('task1', 4, 3, 1, 0)
@@ -0,0 +1,110 @@
+import importlib.util
+import os
+
+import pytest
+
+INDEX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cdk_ecs_windows_fsx', 'lambdas', 'fsx_autotuner', 'index.py')
+spec = importlib.util.spec_from_file_location('fsx_autotuner_index', INDEX)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+
+GIB = 1024 * index.MEBIBYTE
+PERIOD = index.DEFAULT_THRESHOLDS['period_seconds']
+
+
+def period_bytes(throughput_capacity, utilization):
+    # Bytes moved in one period at a fraction of the throughput capacity, split evenly between reads and writes
+    return throughput_capacity * index.MEBIBYTE * PERIOD * utilization / 2
+
+
+def decide(utilization, throughput_capacity=32, storage_capacity=100, free_fraction=0.5, thresholds=None):
+    series = [period_bytes(throughput_capacity, u) for u in utilization]
+    return index.decide(throughput_capacity, storage_capacity, series, series, [storage_capacity * GIB * free_fraction], thresholds)
+
+
+def test_idle_file_system_is_left_alone():
+    assert decide([0.1, 0.2, 0.1]) == {}
+
+
+def test_sustained_high_throughput_steps_up_one_capacity():
+    assert decide([0.85, 0.9, 0.8]) == {'ThroughputCapacity': 64}
+
+
+def test_throughput_must_stay_high_for_the_sustained_periods():
+    # A dip within the last sustained_periods resets it, older periods don't count
+    assert decide([0.9, 0.5, 0.9, 0.9]) == {}
+    assert decide([0.5, 0.9, 0.9, 0.9]) == {'ThroughputCapacity': 64}
+    # Too few periods of data
+    assert decide([0.9, 0.9]) == {}
+    assert decide([0.9, 0.9], thresholds={'sustained_periods': 2}) == {'ThroughputCapacity': 64}
+
+
+def test_throughput_step_is_capped():
+    assert decide([0.9] * 3, throughput_capacity=512) == {}
+    assert decide([0.9] * 3, throughput_capacity=256, thresholds={'max_throughput_capacity': 128}) == {}
+    assert decide([0.9] * 3, throughput_capacity=2048, thresholds={'max_throughput_capacity': 4096}) == {}
+
+
+def test_low_free_storage_grows_storage():
+    assert decide([0.1] * 3, free_fraction=0.1) == {'StorageCapacity': 120}
+    # Only the latest value counts
+    assert index.decide(32, 100, [], [], [10 * GIB, 50 * GIB]) == {}
+
+
+def test_storage_growth_is_at_least_ten_percent():
+    assert decide([0.1] * 3, free_fraction=0.1, thresholds={'storage_growth': 0.05}) == {'StorageCapacity': 110}
+
+
+def test_storage_growth_is_capped():
+    assert decide([0.1] * 3, storage_capacity=4000, free_fraction=0.1) == {}
+    assert decide([0.1] * 3, storage_capacity=3500, free_fraction=0.1) == {'StorageCapacity': 4096}
+
+
+def test_storage_wins_over_throughput():
+    assert decide([0.9] * 3, free_fraction=0.1) == {'StorageCapacity': 120}
+    # Throughput still steps up when storage is at its cap
+    assert decide([0.9] * 3, storage_capacity=4096, free_fraction=0.1) == {'ThroughputCapacity': 64}
+
+
+class FakeFsx:
+
+    def __init__(self, administrative_actions=None):
+        self.file_system = {
+            'StorageCapacity': 100,
+            'WindowsConfiguration': {'ThroughputCapacity': 32},
+            'AdministrativeActions': administrative_actions or []
+        }
+        self.updates = []
+
+    def describe_file_systems(self, FileSystemIds):
+        return {'FileSystems': [self.file_system]}
+
+    def update_file_system(self, **update):
+        self.updates.append(update)
+
+
+class FakeCloudWatch:
+
+    def __init__(self, utilization):
+        self.values = {'read': [period_bytes(32, u) for u in utilization], 'write': [period_bytes(32, u) for u in utilization], 'free': [50 * GIB]}
+
+    def get_metric_data(self, MetricDataQueries, **kwargs):
+        return {'MetricDataResults': [{'Id': query['Id'], 'Values': self.values[query['Id']]} for query in MetricDataQueries]}
+
+
+def test_tune_updates_throughput():
+    fsx = FakeFsx()
+    assert index.tune(fsx, FakeCloudWatch([0.9] * 3), 'fs-1', index.DEFAULT_THRESHOLDS) == {'ThroughputCapacity': 64}
+    assert fsx.updates == [{'FileSystemId': 'fs-1', 'WindowsConfiguration': {'ThroughputCapacity': 64}}]
+
+
+@pytest.mark.parametrize('status', ['PENDING', 'IN_PROGRESS', 'UPDATED_OPTIMIZING'])
+def test_tune_waits_for_the_previous_update(status):
+    fsx = FakeFsx([{'AdministrativeActionType': 'STORAGE_OPTIMIZATION', 'Status': status}])
+    assert index.tune(fsx, FakeCloudWatch([0.9] * 3), 'fs-1', index.DEFAULT_THRESHOLDS) == {}
+    assert fsx.updates == []
+
+
+def test_tune_after_a_completed_update():
+    fsx = FakeFsx([{'AdministrativeActionType': 'FILE_SYSTEM_UPDATE', 'Status': 'COMPLETED'}])
+    assert index.tune(fsx, FakeCloudWatch([0.9] * 3), 'fs-1', index.DEFAULT_THRESHOLDS) == {'ThroughputCapacity': 64}
@@ -0,0 +1,54 @@
+import base64
+
+import pytest
+
+pytest.importorskip('aws_cdk.core')
+
+from fsx_task import COMMAND_LINE_LIMIT, ENTRY_POINT, container_command, content_sync_script, encode_command
+from iis_tuning import IIS_PRESETS, get_iis_tuning
+
+
+def test_sync_script_drops_help_and_comments():
+    script = content_sync_script()
+    assert '<#' not in script and '.SYNOPSIS' not in script
+    assert not any(line.strip().startswith('#') or not line.strip() for line in script.splitlines())
+    for function in ('Get-ContentManifest', 'Compare-ContentManifest', 'Sync-Content', 'Write-StatusRecord'):
+        assert 'function ' + function in script
+
+
+def test_command_passes_the_sync_settings_through():
+    command = container_command('site1', 'interval', 45)
+    assert '$SiteDirectory = "C:\\fsx-windows-dir\\site1"' in command
+    assert command.endswith('-Mode interval -IntervalSeconds 45 -ServiceMonitor C:\\ServiceMonitor.exe')
+    assert '-Source $ContentDirectory -Destination C:\\inetpub\\wwwroot -StatusDirectory "$SiteDirectory\\status" -TaskId $TaskId' in command
+    assert '& {' + content_sync_script() + '}' in command
+
+
+def test_sample_content_only_when_the_site_has_none():
+    command = container_command('site1')
+    assert 'if (-not (Get-ChildItem -Path $ContentDirectory -Force)) {New-Item -Path "$ContentDirectory\\index.html"' in command
+    assert command.index('index.html') < command.index('& {')
+
+
+def test_iis_is_tuned_before_the_sync_starts():
+    assert container_command('site1', iis_tuning=get_iis_tuning('stock')).startswith('$SiteDirectory')
+    command = container_command('site1', iis_tuning=get_iis_tuning('balanced'))
+    assert command.index('appcmd.exe') < command.index('$SiteDirectory')
+
+
+def test_unknown_sync_mode():
+    with pytest.raises(Exception, match='content_sync_mode'):
+        container_command('site1', 'rsync')
+
+
+@pytest.mark.parametrize('preset', sorted(IIS_PRESETS))
+def test_encoded_command_fits_the_command_line(preset):
+    command = container_command('site1', 'watch', 30, get_iis_tuning(preset))
+    encoded = encode_command(command)
+    assert base64.b64decode(encoded).decode('utf-16-le') == command
+    assert len(' '.join(ENTRY_POINT + [encoded])) <= COMMAND_LINE_LIMIT
+
+
+def test_encoded_command_over_the_limit():
+    with pytest.raises(Exception, match='command line limit'):
+        encode_command('x' * (COMMAND_LINE_LIMIT // 2))
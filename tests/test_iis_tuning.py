@@ -0,0 +1,67 @@
+import pytest
+
+from iis_tuning import APPCMD, IIS_PRESETS, IisTuning, get_iis_tuning, render_iis_preamble, timespan
+
+
+def test_default_preset_is_stock():
+    assert get_iis_tuning() == IisTuning()
+    assert render_iis_preamble(get_iis_tuning()) == ''
+
+
+def test_overrides_replace_single_values():
+    tuning = get_iis_tuning('balanced', {'static_max_age': 300, 'queue_length': 2000})
+    assert tuning.static_max_age == 300
+    assert tuning.queue_length == 2000
+    assert tuning.kernel_cache is True
+
+
+@pytest.mark.parametrize('preset, overrides, message', [
+    ('fast', None, 'Unknown IIS preset fast'),
+    ('stock', {'compression': True}, 'Unknown IIS settings compression'),
+    ('stock', {'queue_length': 5}, 'queue_length must be between 10 and 65535'),
+    ('stock', {'idle_timeout': -1}, "idle_timeout can't be negative"),
+])
+def test_invalid_settings(preset, overrides, message):
+    with pytest.raises(Exception, match=message):
+        get_iis_tuning(preset, overrides)
+
+
+def test_timespan():
+    assert timespan(0) == '0.00:00:00'
+    assert timespan(300) == '0.00:05:00'
+    assert timespan(86400) == '1.00:00:00'
+    assert timespan(1740 * 60) == '1.05:00:00'
+
+
+def statements(tuning):
+    preamble = render_iis_preamble(tuning)
+    assert preamble.endswith('; ')
+    return preamble[:-2].split('; ')
+
+
+def test_balanced_preamble():
+    rendered = statements(IIS_PRESETS['balanced'])
+    assert rendered[0] == "& " + APPCMD + " 'set' 'config' '-section:system.webServer/urlCompression' '/doStaticCompression:true' '/doDynamicCompression:false' | Out-Null"
+    assert "'/frequentHitThreshold:1'" in rendered[1]
+    assert "'/enabled:true' '/enableKernelCache:true'" in rendered[2]
+    assert rendered[3].startswith("foreach ($Extension in '.html','.htm','.css'")
+    assert "\"/+profiles.[extension='$Extension',policy='CacheUntilChange',kernelCachePolicy='CacheUntilChange']\"" in rendered[3]
+    assert rendered[4].endswith("'/clientCache.cacheControlMode:UseMaxAge' '/clientCache.cacheControlMaxAge:1.00:00:00' | Out-Null")
+    assert rendered[5] == "& " + APPCMD + " 'set' 'apppool' 'DefaultAppPool' '/queueLength:5000' '/processModel.idleTimeout:0.00:00:00' '/recycling.periodicRestart.time:0.00:00:00' | Out-Null"
+    assert len(rendered) == 6
+    assert not any('Web-Dyn-Compression' in statement for statement in rendered)
+
+
+def test_dynamic_compression_installs_the_feature_first():
+    rendered = statements(IIS_PRESETS['compress-all'])
+    assert rendered[0].startswith('if (-not (Get-WindowsFeature Web-Dyn-Compression).Installed)')
+    assert "'/doDynamicCompression:true'" in rendered[1]
+
+
+def test_app_pool_settings_only_when_changed():
+    assert render_iis_preamble(IisTuning(static_max_age=60)).count("'apppool'") == 0
+    assert "'/queueLength:1000' '/processModel.idleTimeout:0.00:20:00' '/recycling.periodicRestart.time:0.00:00:00'" in render_iis_preamble(IisTuning(periodic_restart=0))
+
+
+def test_app_pool_name_is_quoted_for_powershell():
+    assert "'set' 'apppool' 'Site''s Pool'" in render_iis_preamble(IisTuning(queue_length=2000, app_pool="Site's Pool"))
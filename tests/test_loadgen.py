@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+
+from loadgen.histogram import Histogram
+from loadgen.runner import Stage, parse_stage, run, send_schedule, target_at
+from loadgen.standin import serve
+
+
+@pytest.fixture
+def standin():
+    # Starts stand-in HTTP servers on free ports and returns their URLs
+    servers = []
+
+    def start(delay_ms=0):
+        server = serve('127.0.0.1', 0, delay_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return 'http://127.0.0.1:%d/' % server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    assert histogram.count == 1000
+    assert histogram.min == 1000
+    assert histogram.max == 1000000
+    # Values are reproduced within the bucket precision of about 0.1%
+    for percentile, expected in [(50, 500000), (90, 900000), (99, 990000), (100, 1000000)]:
+        assert abs(histogram.percentile(percentile) - expected) <= expected * 0.001
+    assert histogram.to_dict()['percentiles_ms']['p99_9'] == pytest.approx(999, rel=0.001)
+
+
+def test_histogram_small_values_are_exact():
+    histogram = Histogram()
+    for value in (0, 1, 2, 3, 2047):
+        histogram.record(value)
+    assert [histogram.percentile(p) for p in (20, 40, 60, 80, 100)] == [0, 1, 2, 3, 2047]
+
+
+def test_histogram_merge():
+    first, second = Histogram(), Histogram()
+    first.record(100)
+    second.record(300)
+    first.merge(second)
+    assert (first.count, first.min, first.max, first.mean()) == (2, 100, 300, 200)
+
+
+@pytest.mark.parametrize('value, stage', [
+    ('30:50', Stage(30, 50)),
+    ('30s:50', Stage(30, 50)),
+    ('2m:200', Stage(120, 200)),
+    ('1.5s:0', Stage(1.5, 0)),
+])
+def test_parse_stage(value, stage):
+    assert parse_stage(value) == stage
+
+
+@pytest.mark.parametrize('value', ['30', '0s:10', '10s:-1', 'abc:1'])
+def test_parse_stage_rejects(value):
+    with pytest.raises(ValueError):
+        parse_stage(value)
+
+
+def test_send_schedule_counts():
+    # A ramp from 0 to 200 over 3s is 300 requests, then 2s at 200 is 400 more
+    offsets = list(send_schedule([Stage(3, 200), Stage(2, 200)]))
+    assert len(offsets) == 700
+    assert offsets == sorted(offsets)
+    assert offsets[-1] == pytest.approx(5)
+    # The ramp sends a quarter of its requests in the first half
+    assert sum(1 for offset in offsets if offset <= 1.5) == 75
+
+
+def test_send_schedule_ramp_down_and_start():
+    assert len(list(send_schedule([Stage(2, 0)], start=100))) == 100
+    assert list(send_schedule([Stage(1, 0)])) == []
+
+
+def test_target_at():
+    stages = [Stage(10, 100), Stage(10, 100), Stage(10, 0)]
+    assert [target_at(stages, t) for t in (0, 5, 15, 25, 40)] == [0, 50, 100, 50, 0]
+
+
+def test_run_against_standin(standin):
+    results = asyncio.run(run(standin(), [Stage(1, 40)], max_connections=4))
+    assert results['requests'] == 20
+    assert results['statuses'] == {'200': 20}
+    assert results['errors'] == {}
+    assert results['connections_reused'] > 0
+    assert sum(point['sent'] for point in results['timeline']) == 20
+
+
+def test_service_latency_excludes_queueing(standin):
+    # One connection and 40 rps against a 50ms server, requests queue for the connection
+    results = asyncio.run(run(standin(delay_ms=50), [Stage(1, 40)], start=40, max_connections=1))
+    service = results['latency']['service']['percentiles_ms']
+    response = results['latency']['response']['percentiles_ms']
+    assert 50 <= service['p50'] < 150
+    assert response['p50'] > 2 * service['p50']
+
+
+def test_concurrency_mode(standin):
+    results = asyncio.run(run(standin(), [Stage(0.5, 4)], mode='concurrency', start=4, method='HEAD', max_connections=4))
+    assert results['requests'] > 0
+    assert results['errors'] == {}
+    assert results['connections_opened'] <= 4
+
+
+def test_connection_errors_are_counted():
+    results = asyncio.run(run('http://127.0.0.1:1/', [Stage(0.5, 4)], start=4))
+    assert results['requests'] == 2
+    assert results['errors'] == {'ConnectionRefusedError': 2}
+    assert results['latency']['service']['count'] == 0
@@ -0,0 +1,82 @@
+import json
+import types
+
+import pytest
+
+from site_registry import load_sites
+
+
+def app(sites=None, **context):
+    context['sites'] = sites
+    return types.SimpleNamespace(node=types.SimpleNamespace(try_get_context=context.get))
+
+
+def test_site_directory_defaults_to_the_site_name():
+    assert load_sites(app({'website1': {}}))[0]['site_directory'] == 'website1'
+
+
+@pytest.mark.parametrize('site_directory', ['', 'a/b', 'a\\b', 'site$env', '$(Remove-Item C:\\)', 'site`n'])
+def test_rejects_site_directory(site_directory):
+    with pytest.raises(Exception, match='invalid site_directory'):
+        load_sites(app({'website1': {'site_directory': site_directory}}))
+
+
+def test_rejects_reused_site_directory():
+    with pytest.raises(Exception, match='reuses site_directory'):
+        load_sites(app({'website1': {'site_directory': 'shared'}, 'website2': {'site_directory': 'Shared'}}))
+
+
+def priorities(sites):
+    return {site['name']: (site['load_balancer'], site['priority']) for site in sites}
+
+
+def test_defaults_and_sub_domain():
+    site, = load_sites(app({'website1': {'cpu': 1024}}))
+    assert (site['name'], site['sub_domain'], site['cpu'], site['memory'], site['load_balancer']) == ('website1', 'website1', 1024, 1024, 'shared')
+
+
+def test_rejects_reused_sub_domain():
+    # Across load balancers too, the records live in the same hosted zone
+    with pytest.raises(Exception, match='reuses sub_domain www'):
+        load_sites(app({'website1': {'sub_domain': 'www'}, 'website2': {'sub_domain': 'www', 'load_balancer': 'dedicated'}}))
+
+
+def test_priorities_follow_registry_order():
+    sites = load_sites(app({'website1': {}, 'website2': {}, 'website3': {}}))
+    assert priorities(sites) == {'website1': ('shared', 1), 'website2': ('shared', 2), 'website3': ('shared', 3)}
+
+
+def test_priorities_continue_after_explicit_ones():
+    sites = load_sites(app({'website1': {'priority': 10}, 'website2': {}, 'website3': {'priority': 5}, 'website4': {}}))
+    assert priorities(sites) == {'website1': ('shared', 10), 'website2': ('shared', 11), 'website3': ('shared', 5), 'website4': ('shared', 12)}
+
+
+def test_priorities_are_per_load_balancer():
+    sites = load_sites(app({'website1': {}, 'website2': {'load_balancer': 'dedicated'}, 'website3': {}}))
+    assert priorities(sites) == {'website1': ('shared', 1), 'website2': ('dedicated', 1), 'website3': ('shared', 2)}
+
+
+def test_rejects_reused_priority():
+    with pytest.raises(Exception, match='reuses listener rule priority 3 on load balancer shared'):
+        load_sites(app({'website1': {'priority': 3}, 'website2': {'priority': 3}}))
+    # An explicit priority can also collide with one numbered earlier in the registry
+    with pytest.raises(Exception, match='website2 reuses listener rule priority 1'):
+        load_sites(app({'website1': {}, 'website2': {'priority': 1}}))
+
+
+def test_same_priority_on_different_load_balancers():
+    sites = load_sites(app({'website1': {'priority': 1}, 'website2': {'priority': 1, 'load_balancer': 'dedicated'}}))
+    assert priorities(sites) == {'website1': ('shared', 1), 'website2': ('dedicated', 1)}
+
+
+def test_registry_file(tmp_path):
+    registry = tmp_path / 'sites.json'
+    registry.write_text(json.dumps({'website2': {'sub_domain': 'www'}, 'website3': {}}))
+    # The file wins over the sites context value
+    sites = load_sites(app({'website1': {}}, site_registry=str(registry)))
+    assert [(site['name'], site['sub_domain'], site['priority']) for site in sites] == [('website2', 'www', 1), ('website3', 'website3', 2)]
+
+
+def test_empty_registry():
+    with pytest.raises(Exception, match='at least one site'):
+        load_sites(app({}))
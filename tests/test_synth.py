@@ -0,0 +1,198 @@
+import json
+import os
+
+# Synth checks of the stacks, each synth runs app.py with the cdk.json context plus the overrides given to it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBSITE = 'cdk-ecs-windows-website1'
+
+
+def policies(assembly, stack=WEBSITE):
+    # {metric type: target value} of the target tracking policies
+    return {
+        properties['TargetTrackingScalingPolicyConfiguration']['PredefinedMetricSpecification']['PredefinedMetricType']: properties['TargetTrackingScalingPolicyConfiguration']['TargetValue']
+        for properties in assembly.resources(stack, 'AWS::ApplicationAutoScaling::ScalingPolicy').values()
+    }
+
+
+def test_site_scales_on_requests_cpu_and_memory(synth):
+    assembly = synth()
+    target, = assembly.resources(WEBSITE, 'AWS::ApplicationAutoScaling::ScalableTarget').values()
+    assert (target['MinCapacity'], target['MaxCapacity']) == (2, 6)
+    assert policies(assembly) == {'ALBRequestCountPerTarget': 1000, 'ECSServiceAverageCPUUtilization': 60, 'ECSServiceAverageMemoryUtilization': 70}
+
+
+def test_site_scales_on_configured_metrics_only(synth):
+    assembly = synth(sites={'website1': {'desired_count': 3, 'max_capacity': 8, 'cpu_target_percent': 50}})
+    target, = assembly.resources(WEBSITE, 'AWS::ApplicationAutoScaling::ScalableTarget').values()
+    # Without min_capacity the desired count is the floor
+    assert (target['MinCapacity'], target['MaxCapacity']) == (3, 8)
+    assert policies(assembly) == {'ECSServiceAverageCPUUtilization': 50}
+
+
+def test_site_without_max_capacity_does_not_scale(synth):
+    assembly = synth(sites={'website1': {'desired_count': 2}})
+    assert assembly.resources(WEBSITE, 'AWS::ApplicationAutoScaling::ScalableTarget') == {}
+    assert policies(assembly) == {}
+
+
+CLUSTER = 'cdk-ecs-windows-cluster'
+ECS_OPTIMIZED_AMI = '/aws/service/ami-windows-latest/Windows_Server-2019-English-Core-ECS_Optimized/image_id'
+
+
+def cluster_context(**settings):
+    # The cluster context value is replaced as a whole, keep the cdk.json settings next to the ones under test
+    with open(os.path.join(ROOT, 'cdk.json')) as fp:
+        return dict(json.load(fp)['context']['cluster'], **settings)
+
+
+def launch_template_image(assembly):
+    launch_template, = assembly.resources(CLUSTER, 'AWS::EC2::LaunchTemplate').values()
+    return launch_template['LaunchTemplateData']['ImageId']
+
+
+def test_hosts_launch_the_latest_ecs_optimized_ami(synth):
+    assembly = synth()
+    parameter = launch_template_image(assembly)['Ref']
+    assert assembly.templates[CLUSTER]['Parameters'][parameter]['Default'] == ECS_OPTIMIZED_AMI
+    assert 'cdk-ecs-windows-image' not in assembly.templates
+
+
+def test_hosts_launch_an_explicit_ami(synth):
+    assembly = synth(cluster=cluster_context(ami_id='ami-0123456789abcdef0', golden_image=True))
+    assert launch_template_image(assembly) == 'ami-0123456789abcdef0'
+    # An explicit ami_id wins over building a golden image
+    assert 'cdk-ecs-windows-image' not in assembly.templates
+
+
+def test_hosts_launch_the_golden_image(synth):
+    assembly = synth(cluster=cluster_context(golden_image=True))
+    image_id = launch_template_image(assembly)['Fn::ImportValue']
+    image, = assembly.resources('cdk-ecs-windows-image', 'AWS::ImageBuilder::Image')
+    assert image_id.startswith('cdk-ecs-windows-image:') and image in image_id
+    assert 'cdk-ecs-windows-image' in assembly.dependencies(CLUSTER)
+
+
+def attributes(properties, key):
+    return {attribute['Key']: attribute['Value'] for attribute in properties[key]}
+
+
+def test_target_group_uses_the_balanced_preset(synth):
+    target_group, = synth().resources(WEBSITE, 'AWS::ElasticLoadBalancingV2::TargetGroup').values()
+    assert attributes(target_group, 'TargetGroupAttributes') == {
+        'deregistration_delay.timeout_seconds': '30',
+        'slow_start.duration_seconds': '60',
+        'load_balancing.algorithm.type': 'round_robin'
+    }
+    assert (target_group['HealthCheckIntervalSeconds'], target_group['HealthCheckTimeoutSeconds'], target_group['HealthyThresholdCount'], target_group['UnhealthyThresholdCount']) == (15, 5, 2, 3)
+
+
+def test_target_group_preset_and_overrides(synth):
+    assembly = synth(sites={'website1': {'target_group_preset': 'least-outstanding', 'target_group': {'deregistration_delay': 120, 'health_check_path': '/health'}}})
+    target_group, = assembly.resources(WEBSITE, 'AWS::ElasticLoadBalancingV2::TargetGroup').values()
+    assert attributes(target_group, 'TargetGroupAttributes') == {
+        'deregistration_delay.timeout_seconds': '120',
+        'load_balancing.algorithm.type': 'least_outstanding_requests'
+    }
+    assert target_group['HealthCheckPath'] == '/health'
+
+
+def test_load_balancer_idle_timeout_and_http2(synth):
+    load_balancer, = synth().resources('cdk-ecs-windows-alb-shared', 'AWS::ElasticLoadBalancingV2::LoadBalancer').values()
+    assert attributes(load_balancer, 'LoadBalancerAttributes')['idle_timeout.timeout_seconds'] == '60'
+    # HTTP/2 is on by default, CloudFormation only gets the attribute when it is turned off
+    assert 'routing.http2.enabled' not in attributes(load_balancer, 'LoadBalancerAttributes')
+
+    load_balancer, = synth(load_balancers={'shared': {'idle_timeout': 300, 'http2': False}}).resources('cdk-ecs-windows-alb-shared', 'AWS::ElasticLoadBalancingV2::LoadBalancer').values()
+    assert attributes(load_balancer, 'LoadBalancerAttributes')['idle_timeout.timeout_seconds'] == '300'
+    assert attributes(load_balancer, 'LoadBalancerAttributes')['routing.http2.enabled'] == 'false'
+
+
+def test_stack_dependencies(synth):
+    assembly = synth()
+    assert assembly.dependencies('cdk-ecs-windows-network') == set()
+    assert assembly.dependencies('cdk-ecs-windows-directory') == {'cdk-ecs-windows-network'}
+    # Storage and compute only share network and directory, so they deploy in parallel
+    assert assembly.dependencies('cdk-ecs-windows-storage') == {'cdk-ecs-windows-network', 'cdk-ecs-windows-directory'}
+    assert assembly.dependencies(CLUSTER) == {'cdk-ecs-windows-network', 'cdk-ecs-windows-directory'}
+    assert assembly.dependencies('cdk-ecs-windows-bastion') == {'cdk-ecs-windows-network'}
+    # The hosts security group lives in the network stack, the load balancers don't wait for the cluster
+    assert assembly.dependencies('cdk-ecs-windows-alb-shared') == {'cdk-ecs-windows-network'}
+    assert assembly.dependencies(WEBSITE) == {'cdk-ecs-windows-network', 'cdk-ecs-windows-directory', 'cdk-ecs-windows-storage', CLUSTER, 'cdk-ecs-windows-alb-shared'}
+
+
+def test_every_load_balancer_depends_only_on_the_network(synth):
+    assembly = synth(sites={'website1': {}, 'website2': {'load_balancer': 'dedicated'}})
+    for stack in ('cdk-ecs-windows-alb-shared', 'cdk-ecs-windows-alb-dedicated'):
+        assert assembly.dependencies(stack) == {'cdk-ecs-windows-network'}
+
+
+DIRECTORY = 'cdk-ecs-windows-directory'
+RESOLVER_TYPES = ['AWS::Route53Resolver::ResolverEndpoint', 'AWS::Route53Resolver::ResolverRule', 'AWS::Route53Resolver::ResolverRuleAssociation']
+
+
+def test_directory_dns_mode(synth):
+    assembly = synth()
+    dhcp_options, = assembly.resources(DIRECTORY, 'AWS::EC2::DHCPOptions').values()
+    # Both domain controllers resolve every name in the VPC
+    assert dhcp_options['DomainNameServers'] == [{'Fn::Select': [index, {'Fn::GetAtt': ['MAD', 'DnsIpAddresses']}]} for index in (0, 1)]
+    assert dhcp_options['NtpServers'] == ['169.254.169.123']
+    assert len(assembly.resources(DIRECTORY, 'AWS::EC2::VPCDHCPOptionsAssociation')) == 1
+    for resource_type in RESOLVER_TYPES:
+        assert assembly.resources(DIRECTORY, resource_type) == {}
+
+
+def test_resolver_dns_mode(synth):
+    assembly = synth(cluster=cluster_context(dns_mode='resolver'))
+    dhcp_options, = assembly.resources(DIRECTORY, 'AWS::EC2::DHCPOptions').values()
+    assert dhcp_options['DomainNameServers'] == ['AmazonProvidedDNS']
+    assert len(assembly.resources(DIRECTORY, 'AWS::EC2::VPCDHCPOptionsAssociation')) == 1
+
+    (endpoint_id, endpoint), = assembly.resources(DIRECTORY, 'AWS::Route53Resolver::ResolverEndpoint').items()
+    assert endpoint['Direction'] == 'OUTBOUND'
+    assert len(endpoint['IpAddresses']) == 2
+    # Only the AD domain is forwarded, through the endpoint to both domain controllers
+    (rule_id, rule), = assembly.resources(DIRECTORY, 'AWS::Route53Resolver::ResolverRule').items()
+    assert (rule['RuleType'], rule['DomainName']) == ('FORWARD', dhcp_options['DomainName'])
+    assert rule['ResolverEndpointId'] == {'Fn::GetAtt': [endpoint_id, 'ResolverEndpointId']}
+    assert rule['TargetIps'] == [{'Ip': {'Fn::Select': [index, {'Fn::GetAtt': ['MAD', 'DnsIpAddresses']}]}, 'Port': '53'} for index in (0, 1)]
+    association, = assembly.resources(DIRECTORY, 'AWS::Route53Resolver::ResolverRuleAssociation').values()
+    assert association['ResolverRuleId'] == {'Fn::GetAtt': [rule_id, 'ResolverRuleId']}
+
+
+def test_latency_alarms_notify_the_alarm_topic(synth):
+    alarms = synth().resources(WEBSITE, 'AWS::CloudWatch::Alarm')
+    assert len(alarms) == 2
+    assert all('AlarmActions' not in alarm and 'OKActions' not in alarm for alarm in alarms.values())
+
+    topic_arn = 'arn:aws:sns:eu-west-1:123456789012:site-alarms'
+    alarms = synth(sites={'website1': {'observability': {'alarm_topic_arn': topic_arn, 'latency_p99_ms': 0}}}).resources(WEBSITE, 'AWS::CloudWatch::Alarm')
+    alarm, = alarms.values()
+    assert (alarm['AlarmActions'], alarm['OKActions']) == ([topic_arn], [topic_arn])
+
+
+def test_sites_run_on_the_cluster_capacity_provider(synth):
+    assembly = synth()
+    (provider_id, provider), = assembly.resources(CLUSTER, 'AWS::ECS::CapacityProvider').items()
+    asg_id, = assembly.resources(CLUSTER, 'AWS::AutoScaling::AutoScalingGroup')
+    # ECS takes the group name or a full ARN, not CDK's wildcard group ARN
+    assert provider['AutoScalingGroupProvider']['AutoScalingGroupArn'] == {'Ref': asg_id}
+    association, = assembly.resources(CLUSTER, 'AWS::ECS::ClusterCapacityProviderAssociations').values()
+    assert association['CapacityProviders'] == [{'Ref': provider_id}]
+
+    service, = assembly.resources(WEBSITE, 'AWS::ECS::Service').values()
+    assert service['CapacityProviderStrategy'] == [{'CapacityProvider': provider['Name'], 'Weight': 1}]
+    assert 'LaunchType' not in service
+
+
+def test_sites_use_the_ec2_launch_type_without_a_capacity_provider(synth):
+    assembly = synth(cluster=cluster_context(target_capacity_percent=None))
+    assert assembly.resources(CLUSTER, 'AWS::ECS::CapacityProvider') == {}
+    service, = assembly.resources(WEBSITE, 'AWS::ECS::Service').values()
+    assert 'CapacityProviderStrategy' not in service
+    assert service['LaunchType'] == 'EC2'
+
+
+def test_null_latency_slo_keeps_the_default(synth):
+    alarms = synth(sites={'website1': {'observability': {'latency_p90_ms': None, 'latency_p99_ms': 0}}}).resources(WEBSITE, 'AWS::CloudWatch::Alarm')
+    alarm, = alarms.values()
+    assert alarm['Threshold'] == 0.5
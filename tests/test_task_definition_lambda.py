@@ -0,0 +1,181 @@
+import importlib.util
+import json
+import os
+import types
+
+import pytest
+
+INDEX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cdk_ecs_windows_fsx', 'lambdas', 'task_definition', 'index.py')
+spec = importlib.util.spec_from_file_location('task_definition_index', INDEX)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+
+ARN = 'arn:aws:ecs:eu-west-1:123456789012:task-definition/'
+
+
+class ClientException(Exception):
+    pass
+
+
+def revision_of(arn):
+    return int(arn.rsplit(':', 1)[1])
+
+
+class FakeEcs:
+    # Just enough of the boto3 ECS client, revisions are {arn: {'status': ..., 'tags': [...]}}
+    exceptions = types.SimpleNamespace(ClientException=ClientException)
+
+    def __init__(self, revisions=None, page_size=100):
+        self.revisions = dict(revisions or {})
+        self.page_size = page_size
+        self.registered = []
+        self.deregistered = []
+        self.deleted = []
+
+    def describe_task_definition(self, taskDefinition, include):
+        arns = [arn for arn, revision in self.revisions.items() if index.family_of(arn) == taskDefinition and revision['status'] == 'ACTIVE']
+        if not arns:
+            raise ClientException('Unable to describe task definition.')
+        latest = max(arns, key=revision_of)
+        return {'taskDefinition': {'taskDefinitionArn': latest}, 'tags': self.revisions[latest]['tags']}
+
+    def register_task_definition(self, tags, family, **parameters):
+        # Revision numbers keep counting after deletes
+        arn = ARN + family + ':' + str(max([revision_of(a) for a in self.revisions if index.family_of(a) == family] + [len(self.deleted_arns(family))]) + 1)
+        self.revisions[arn] = {'status': 'ACTIVE', 'tags': tags}
+        self.registered.append((arn, parameters))
+        return {'taskDefinition': {'taskDefinitionArn': arn}}
+
+    def deleted_arns(self, family):
+        return [arn for batch in self.deleted for arn in batch if index.family_of(arn) == family]
+
+    def get_paginator(self, name):
+        assert name == 'list_task_definitions'
+        return self
+
+    def paginate(self, familyPrefix, status, sort):
+        arns = sorted((arn for arn, revision in self.revisions.items() if arn.startswith(ARN + familyPrefix) and revision['status'] == status), key=lambda arn: (index.family_of(arn), revision_of(arn)), reverse=sort == 'DESC')
+        for i in range(0, len(arns), self.page_size):
+            yield {'taskDefinitionArns': arns[i:i + self.page_size]}
+
+    def deregister_task_definition(self, taskDefinition):
+        if self.revisions.get(taskDefinition, {}).get('status') != 'ACTIVE':
+            raise ClientException('The specified task definition is not ACTIVE.')
+        self.revisions[taskDefinition]['status'] = 'INACTIVE'
+        self.deregistered.append(taskDefinition)
+
+    def delete_task_definitions(self, taskDefinitions):
+        assert 1 <= len(taskDefinitions) <= 10
+        for arn in taskDefinitions:
+            # Only INACTIVE revisions can be deleted
+            assert self.revisions.pop(arn)['status'] == 'INACTIVE'
+        self.deleted.append(list(taskDefinitions))
+
+
+def revisions(family, count, tags=None, status='ACTIVE'):
+    return {ARN + family + ':' + str(revision): {'status': status, 'tags': tags or []} for revision in range(1, count + 1)}
+
+
+PARAMETERS = {'family': 'website1', 'containerDefinitions': [{'name': 'IISContainer', 'cpu': 512}]}
+
+
+def test_parameters_hash_ignores_key_order():
+    reordered = {'containerDefinitions': [{'cpu': 512, 'name': 'IISContainer'}], 'family': 'website1'}
+    assert index.parameters_hash(PARAMETERS) == index.parameters_hash(reordered)
+    assert index.parameters_hash(PARAMETERS) != index.parameters_hash(dict(PARAMETERS, family='website2'))
+
+
+def test_find_registered_hit():
+    digest = index.parameters_hash(PARAMETERS)
+    ecs = FakeEcs(revisions('website1', 2, [{'key': index.HASH_TAG, 'value': digest}]))
+    assert index.find_registered(ecs, 'website1', digest) == ARN + 'website1:2'
+
+
+def test_find_registered_miss():
+    ecs = FakeEcs(revisions('website1', 2, [{'key': index.HASH_TAG, 'value': 'other'}]))
+    assert index.find_registered(ecs, 'website1', index.parameters_hash(PARAMETERS)) is None
+
+
+def test_find_registered_new_family():
+    assert index.find_registered(FakeEcs(), 'website1', index.parameters_hash(PARAMETERS)) is None
+
+
+def test_prune_keeps_retained_revisions():
+    ecs = FakeEcs(revisions('website1', 8))
+    stale = index.prune_revisions(ecs, 'website1', ARN + 'website1:8', retain=5)
+    assert stale == [ARN + 'website1:' + str(revision) for revision in (3, 2, 1)]
+    assert ecs.deregistered == stale
+    assert ecs.deleted == [stale]
+    assert sorted(ecs.revisions, key=revision_of) == [ARN + 'website1:' + str(revision) for revision in range(4, 9)]
+
+
+def test_prune_deletes_in_batches_of_ten():
+    ecs = FakeEcs(revisions('website1', 26), page_size=7)
+    stale = index.prune_revisions(ecs, 'website1', ARN + 'website1:26', retain=1)
+    assert len(stale) == 25
+    assert [len(batch) for batch in ecs.deleted] == [10, 10, 5]
+
+
+def test_prune_deletes_inactive_revisions():
+    ecs = FakeEcs(dict(revisions('website1', 3, status='INACTIVE'), **{ARN + 'website1:4': {'status': 'ACTIVE', 'tags': []}}))
+    stale = index.prune_revisions(ecs, 'website1', ARN + 'website1:4', retain=5)
+    assert stale == [ARN + 'website1:' + str(revision) for revision in (3, 2, 1)]
+    assert ecs.deregistered == []
+    assert list(ecs.revisions) == [ARN + 'website1:4']
+
+
+def test_prune_ignores_families_sharing_the_prefix():
+    ecs = FakeEcs(dict(revisions('website1', 3), **revisions('website10', 4)))
+    stale = index.prune_revisions(ecs, 'website1', ARN + 'website1:3', retain=1)
+    assert stale == [ARN + 'website1:2', ARN + 'website1:1']
+    assert not any('website10' in arn for arn in ecs.deregistered)
+    assert len([arn for arn in ecs.revisions if 'website10' in arn]) == 4
+
+
+def event(request_type, parameters=PARAMETERS, retain=5, **extra):
+    return dict({
+        'RequestType': request_type,
+        'ResourceProperties': {'TaskDefinition': json.dumps(parameters), 'RetainRevisions': str(retain)}
+    }, **extra)
+
+
+def test_on_event_registers_once_and_skips_unchanged():
+    ecs = FakeEcs()
+    arn, data = index.on_event(ecs, event('Create'))
+    assert arn == ARN + 'website1:1'
+    assert data == {'TaskDefinitionArn': arn, 'ParametersHash': index.parameters_hash(PARAMETERS)}
+
+    # The same parameters again, e.g. an update triggered by another property, don't register a revision
+    assert index.on_event(ecs, event('Update', PhysicalResourceId=arn))[0] == arn
+    assert len(ecs.registered) == 1
+
+
+@pytest.mark.parametrize('retain', [1, 2, 5])
+def test_on_event_update_then_cleanup_delete(retain):
+    ecs = FakeEcs()
+    first, _ = index.on_event(ecs, event('Create', retain=retain))
+    changed = dict(PARAMETERS, containerDefinitions=[{'name': 'IISContainer', 'cpu': 1024}])
+    second, _ = index.on_event(ecs, event('Update', changed, retain=retain, PhysicalResourceId=first))
+    assert second == ARN + 'website1:2'
+
+    # CloudFormation then deletes the replaced physical id with the old properties, the revision is left to the retention limit
+    assert index.on_event(ecs, event('Delete', retain=retain, PhysicalResourceId=first)) == (first, {})
+    assert ecs.revisions[second]['status'] == 'ACTIVE'
+    if retain == 1:
+        assert first not in ecs.revisions
+    else:
+        assert ecs.revisions[first]['status'] == 'ACTIVE'
+        assert ecs.deregistered == []
+
+
+def test_on_event_delete_retires_the_family():
+    ecs = FakeEcs(dict(revisions('website1', 2, status='INACTIVE'), **revisions('website10', 1)))
+    ecs.revisions.update({ARN + 'website1:3': {'status': 'ACTIVE', 'tags': []}, ARN + 'website1:4': {'status': 'ACTIVE', 'tags': []}})
+    index.on_event(ecs, event('Delete', PhysicalResourceId=ARN + 'website1:4'))
+    assert list(ecs.revisions) == [ARN + 'website10:1']
+
+
+def test_on_event_delete_with_non_arn_physical_id():
+    ecs = FakeEcs(revisions('website1', 1))
+    assert index.on_event(ecs, event('Delete', PhysicalResourceId='2026/10/18/[$LATEST]abc')) == ('2026/10/18/[$LATEST]abc', {})
+    assert ecs.deregistered == [] and ecs.deleted == []